@@ -0,0 +1,48 @@
+"""Measures the cold import time of the package and of each submodule, each in a fresh Python process.
+
+Usage: python benchmark_import.py -r 5
+"""
+import argparse
+import pkgutil
+import subprocess
+import sys
+
+import cloth_manipulation
+
+IMPORT_TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def cold_import_time(statement, repeat):
+    """Fastest wall time in seconds of an import statement in a new interpreter, None if the import fails."""
+    times = []
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-c", IMPORT_TIMER.format(statement=statement)], capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            return None
+        times.append(float(process.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+def benchmark(repeat):
+    statements = ["import numpy", "import cloth_manipulation", "from cloth_manipulation import mean_distance"]
+    for module in pkgutil.iter_modules(cloth_manipulation.__path__):
+        statements.append(f"import cloth_manipulation.{module.name}")
+
+    for statement in statements:
+        time = cold_import_time(statement, repeat)
+        result = "unavailable" if time is None else f"{1000 * time:8.2f} ms"
+        print(f"{statement:55s} {result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Imports per statement, the fastest is reported.")
+    args = parser.parse_args()
+    benchmark(args.repeat)
@@ -0,0 +1,51 @@
+"""Compares the batched loss kernels with calling the per-pair losses in a Python loop.
+
+Usage: python benchmark_losses.py -b 200 -n 20000
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from cloth_manipulation.losses import (
+    batch_mean_distance,
+    batch_mean_squared_distance,
+    batch_root_mean_squared_distance,
+    mean_distance,
+    mean_squared_distance,
+    root_mean_squared_distance,
+)
+
+
+def benchmark(batch_size, n_vertices, dtype, repeat):
+    rng = np.random.default_rng(0)
+    target = rng.random((n_vertices, 3)).astype(dtype)
+    positions = rng.random((batch_size, n_vertices, 3)).astype(dtype)
+    out = np.empty(batch_size, dtype=dtype)
+
+    pairs = [
+        ("mean_distance", mean_distance, batch_mean_distance),
+        ("mean_squared_distance", mean_squared_distance, batch_mean_squared_distance),
+        ("root_mean_squared_distance", root_mean_squared_distance, batch_root_mean_squared_distance),
+    ]
+
+    print(f"B={batch_size} N={n_vertices} dtype={np.dtype(dtype).name}")
+    for name, loss, batch_loss in pairs:
+        looped = np.array([loss(target, p) for p in positions])
+        batched = batch_loss(positions, target, out=out)
+        assert np.allclose(looped, batched, rtol=1e-4)
+
+        t_looped = min(timeit.repeat(lambda: [loss(target, p) for p in positions], number=1, repeat=repeat))
+        t_batched = min(timeit.repeat(lambda: batch_loss(positions, target, out=out), number=1, repeat=repeat))
+        print(f"  {name:28s} loop {1000 * t_looped:8.2f} ms  batch {1000 * t_batched:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-b", "--batch_size", type=int, default=200)
+    parser.add_argument("-n", "--n_vertices", type=int, default=20000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for dtype in (np.float64, np.float32):
+        benchmark(args.batch_size, args.n_vertices, dtype, args.repeat)
@@ -10,36 +10,39 @@ sys.path.insert(0, CIPC_BUILD_PATH)
 
 import bpy
 import Drivers
+import numpy as np
 from JGSL import StdVectorXd, Storage, Vector2d, Vector3d, Vector4i
 
+from cloth_manipulation.grasp import keyframed_transforms, rigid_motion, rigid_velocities
+from cloth_manipulation.grippers import action_ranges, id_ranges
+from cloth_manipulation.mesh import get_world_vertex_coordinates
 
-def cipc_action(gripper, cloth, grasped, frame):
-    scene = bpy.context.scene
-    scene.frame_set(frame)
 
-    positions = {}
-    for id in grasped:
-        positions[id] = cloth.matrix_world @ cloth.data.vertices[id].co
+def cipc_action(gripper, cloth, grasped, frame):
+    """Velocities of the grasped vertices that move them with the gripper from frame to frame + 1.
 
-    cloth.parent = gripper
-    cloth.matrix_parent_inverse = gripper.matrix_world.inverted()
+    The gripper poses are evaluated from its fcurves, so the scene is not re-evaluated.
+    """
+    grasped = sorted(grasped)
+    transforms = keyframed_transforms(gripper, [frame, frame + 1])
+    vertices = get_world_vertex_coordinates(cloth)[grasped]
+    dt = 1.0 / bpy.context.scene.render.fps
+    velocities = rigid_velocities(vertices, transforms[0], transforms[1], dt)
+    return dict(zip(grasped, velocities))
 
-    scene.frame_set(frame + 1)
-    positions_next = {}
-    for id in grasped:
-        positions_next[id] = cloth.matrix_world @ cloth.data.vertices[id].co
-    cloth.parent = None
 
-    velocities = {}
-    dt = 1.0 / scene.render.fps
+def cipc_rigid_action(gripper, grasped, frame):
+    """The grasped vertex ids and the rigid motion that moves them with the gripper from frame to frame + 1."""
+    transforms = keyframed_transforms(gripper, [frame, frame + 1])
+    dt = 1.0 / bpy.context.scene.render.fps
+    return np.array(sorted(grasped), dtype=np.int64), rigid_motion(transforms[0], transforms[1], dt)
 
-    for id in grasped:
-        p = positions[id]
-        p_next = positions_next[id]
-        v = (p_next - p) / dt
-        velocities[id] = v
 
-    return velocities
+def actions_equal(action, other):
+    """Whether two (nested) tuples or lists of arrays and numbers are equal."""
+    if isinstance(action, (tuple, list)):
+        return len(action) == len(other) and all(actions_equal(a, b) for a, b in zip(action, other))
+    return np.array_equal(action, other)
 
 
 def to_Vector3d(v):
@@ -115,30 +118,60 @@ class Simulation:
             vIndRangeGround,
         )
 
-        sim.write(0)
+        self.actions = None  # The actions that the current boundary conditions were built for.
 
-    def step(self, action={}):
-        """Advance the C-IPC simulation a single frame.
+        sim.write(0)
 
-        Args:
-            action (dict): dictionary with keys the vertex ids and values the vertex velcoties
-        """
+    def set_DBC(self, action, rigid_actions=()):
+        """Replace the Dirichlet boundary conditions by the ground and one condition per range of the actions."""
         sim = self.sim
-        controlled_vertices = action.keys()
-
-        # Reset DBCs
         sim.DBC = Storage.V4dStorage()
         sim.DBCMotion = Storage.V2iV3dV3dV3dSdStorage()
 
         # Ground plane DBC
         sim.set_DBC_with_range(*self.ground_DBC)
 
-        for id in controlled_vertices:
-            v = to_Vector3d(action[id])
-            vIndRange = Vector4i(4 + id, 0, 5 + id, -1)
-            sim.set_DBC_with_range(self.x_min, self.x_max, v, *self.rotation, vIndRange)
+        for start, end, velocity in zip(*action_ranges(*action)):
+            vIndRange = Vector4i(4 + int(start), 0, 4 + int(end), -1)
+            sim.set_DBC_with_range(self.x_min, self.x_max, to_Vector3d(velocity), *self.rotation, vIndRange)
+
+        # Only the box bounds x_min and x_max are relative to the bounding box of the vertices in vIndRange, which
+        # is why +-10 selects all of them. rotCenter is an absolute world-space point, in the Y-up frame of C-IPC
+        # like the velocity and axis. It is where the gripper is at this frame, so it has to be set again every
+        # frame the gripper moves, which step does.
+        for ids, (velocity, center, axis, angular_velocity) in rigid_actions:
+            rotation = to_Vector3d(center), to_Vector3d(axis), float(np.rad2deg(angular_velocity))
+            for start, end in zip(*id_ranges(ids)):
+                vIndRange = Vector4i(4 + int(start), 0, 4 + int(end), -1)
+                sim.set_DBC_with_range(self.x_min, self.x_max, to_Vector3d(velocity), *rotation, vIndRange)
+
+    def step(self, action={}, rigid_actions=()):
+        """Advance the C-IPC simulation a single frame.
+
+        The boundary conditions persist across frames and are only rebuilt when the actions change. The actions of a
+        moving gripper change every frame, so the conditions are rebuilt on every frame that a gripper moves and
+        the check only saves the rebuild while all grippers stand still. Consecutive vertices with the same
+        velocity share a single condition. Grippers that rotate give each grasped vertex a
+        different velocity, pass their rigid actions instead, so all their consecutive vertices share a condition
+        that translates and rotates them.
+
+        Args:
+            action: dictionary with keys the vertex ids and values the vertex velcoties, or a tuple of (G,) vertex
+                ids and (G, 3) velocities as returned by TrajectoryGripper.velocities.
+            rigid_actions: (ids, motion) pairs as returned by TrajectoryGripper.rigid_action and cipc_rigid_action.
+        """
+        if isinstance(action, dict):
+            ids = np.fromiter(action.keys(), dtype=np.int64, count=len(action))
+            velocities = np.array(list(action.values()), dtype=np.float64).reshape(-1, 3)
+            action = ids, velocities
+
+        actions = action, list(rigid_actions)
+        if self.actions is None or not actions_equal(actions, self.actions):
+            self.set_DBC(*actions)
+            self.actions = actions
 
         # Advance
+        sim = self.sim
         sim.current_frame += 1
         sim.advance_one_frame(sim.current_frame)
         sim.write(sim.current_frame)
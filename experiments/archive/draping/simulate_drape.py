@@ -13,6 +13,8 @@ os.environ.setdefault("INSIDE_OF_THE_INTERNAL_BLENDER_PYTHON_ENVIRONMENT", "1")
 
 import blenderproc as bproc
 
+from cloth_manipulation.scene import setup_enviroment_texture
+
 
 def make_square_cloth(size, subdivisions, location):
     cloth = bproc.object.create_primitive("PLANE", size=size, location=location)
@@ -72,9 +74,7 @@ def run_drape_simulation(sphere_radius, cloth_size, cloth_subdivisions, cloth_ma
     cloth.blender_obj.hide_viewport = True
     cloth.blender_obj.hide_render = True
 
-    hdri_name = "immenstadter_horn"
-    hdri_path = abt.download_hdri(hdri_name, paths["run"], res="1k")
-    abt.load_hdri(hdri_path)
+    setup_enviroment_texture("immenstadter_horn")
 
     # Plane to prevent colored light from the HDRI floor
     bproc.object.create_primitive("PLANE", size=1, location=(0, 0, -1))
@@ -1,87 +1,27 @@
 import bpy
 import numpy as np
 
+from cloth_manipulation import grasp
+from cloth_manipulation.mesh import get_world_vertex_coordinates
 
-def bounding_box(coords):
-    coords = np.array(coords)
 
-    x_min = np.min(coords[:, 0])
-    y_min = np.min(coords[:, 1])
-    z_min = np.min(coords[:, 2])
-
-    x_max = np.max(coords[:, 0])
-    y_max = np.max(coords[:, 1])
-    z_max = np.max(coords[:, 2])
-
-    return (x_min, y_min, z_min), (x_max, y_max, z_max)
-
-
-def between(v, min, max):
-    return v >= min and v <= max
-
-
-def check_interval_overlap(a, b, c, d):
-    return between(c, a, b) or between(d, a, b) or between(a, c, d) or between(b, c, d)
-
-
-def check_bb_overlap(bbox0, bbox1):
-    min0, max0 = bbox0
-    min1, max1 = bbox1
-
-    min0_x, min0_y, min0_z = min0
-    max0_x, max0_y, max0_z = max0
-    min1_x, min1_y, min1_z = min1
-    max1_x, max1_y, max1_z = max1
-
-    x_overlap = check_interval_overlap(min0_x, max0_x, min1_x, max1_x)
-    y_overlap = check_interval_overlap(min0_y, max0_y, min1_y, max1_y)
-    z_overlap = check_interval_overlap(min0_z, max0_z, min1_z, max1_z)
-
-    return x_overlap and y_overlap and z_overlap
-
-
-def find_grasped_vertices(obj, gripper):
-    gripper_verts = [gripper.matrix_world @ v.co for v in gripper.data.vertices]
-    gripper_bb = bounding_box(gripper_verts)
-
-    grasped_vertices = set()
-
-    for p in obj.data.polygons:
-        poly_verts = [obj.matrix_world @ obj.data.vertices[id].co for id in p.vertices]
-        poly_bb = bounding_box(poly_verts)
-
-        if check_bb_overlap(gripper_bb, poly_bb):
-            for id in p.vertices:
-                grasped_vertices.add(id)
-
-    return grasped_vertices
+def find_grasped_vertices(obj, gripper, index=None):
+    return grasp.find_grasped_vertices(obj, gripper, index)
 
 
 def get_grasped_verts_trajectories(obj, gripper, start_frame, end_frame):
-    grasped_vertices = find_grasped_vertices(obj, gripper)
-
-    # Make gripper parent to make cloth move with gripper as if it was a rigid body
-    obj.parent = gripper
-    obj.matrix_parent_inverse = gripper.matrix_world.inverted()
+    grasped_vertices = sorted(find_grasped_vertices(obj, gripper))
 
-    scene = bpy.context.scene
-    dt = 1.0 / scene.render.fps
-
-    trajectories = {id: [] for id in grasped_vertices}
-    times = []
-
-    obj_verts = obj.data.vertices
+    # The cloth moves with the gripper as if it was a rigid body, from the gripper's current pose.
+    frames = np.arange(start_frame, end_frame + 1)
+    transforms = grasp.keyframed_transforms(gripper, frames)
+    vertices = get_world_vertex_coordinates(obj)[grasped_vertices]
+    positions = grasp.grasped_vertex_trajectories(vertices, transforms, np.array(gripper.matrix_world))
 
-    for i in range(start_frame, end_frame + 1):
-        scene.frame_set(i)
-        times.append(i * dt)
+    dt = 1.0 / bpy.context.scene.render.fps
+    times = frames * dt
 
-        for id in grasped_vertices:
-            trajectories[id].append(obj.matrix_world @ obj_verts[id].co)
-
-    scene.frame_set(0)
-
-    obj.parent = None
+    trajectories = dict(zip(grasped_vertices, positions.transpose(1, 0, 2)))
     return trajectories, times
 
 
@@ -110,17 +50,10 @@ def set_trajectory_height(gripper, height):
 
 
 def calculate_velocities(trajectories, times):
-    velocities = {}
-    for id, trajectory in trajectories.items():
-        velocities[id] = []
-        for i in range(len(trajectory) - 1):
-            x, x_next = trajectory[i], trajectory[i + 1]
-            t, t_next = times[i], times[i + 1]
-            dx = x_next - x
-            dt = t_next - t
-            v = dx / dt
-            velocities[id].append(v)
-    return velocities
+    ids = list(trajectories)
+    positions = np.stack([trajectories[id] for id in ids], axis=1)
+    velocities = grasp.finite_difference_velocities(positions, np.asarray(times))
+    return dict(zip(ids, velocities.transpose(1, 0, 2)))
 
 
 def make_gripper(name):
@@ -137,12 +70,15 @@ def make_gripper(name):
 
 def update_active_grippers(grippers, active_grippers, cloth, frame):
     scene = bpy.context.scene
+    index = None  # The face bounding boxes of the cloth at frame, shared by the grippers that close on it.
 
     for gripper in grippers:
         scene.frame_set(frame + 1)
         if gripper not in active_grippers and not gripper.hide_viewport:
             scene.frame_set(frame)
-            grasped = find_grasped_vertices(cloth, gripper)
+            if index is None:
+                index = grasp.GraspIndex.from_object(cloth)
+            grasped = find_grasped_vertices(cloth, gripper, index)
             active_grippers[gripper] = grasped
 
         scene.frame_set(frame + 1)
@@ -51,7 +51,7 @@ def run_experiment(height, run_dir=None):
 
     # Simulating with CIPC and importing the results
     simulate(cloth_path, ground_path, paths["cipc"], velocities)
-    import_cipc_outputs(paths["cipc"])
+    cloth_sim = import_cipc_outputs(paths["cipc"])
 
     # Saving the visualizations
     bpy.ops.object.paths_update_visible()
@@ -60,7 +60,7 @@ def run_experiment(height, run_dir=None):
     # Calculating losses
     # no need to transform to world space because origins coincide
     targets = np.array([v.co for v in objects[f"{cloth_name}_target"].data.vertices])
-    positions = np.array([v.co for v in objects["sim100"].data.vertices])
+    positions = np.array([v.co for v in cloth_sim.data.shape_keys.key_blocks["frame100"].data])
 
     distances = np.linalg.norm(targets - positions, axis=1)
     sq_distances = distances ** 2
@@ -20,7 +20,7 @@ from cm_utils import (
     render,
     save_dict_as_json,
 )
-from cm_utils.cipc import Simulation, cipc_action
+from cm_utils.cipc import Simulation, cipc_rigid_action
 from cm_utils.folds_old import MiddleFold, SideFold, SleeveFold
 from cm_utils.grasp import update_active_grippers
 
@@ -109,15 +109,10 @@ def run_experiment(height_ratio, offset_ratio, run_dir=None):
 
     active_grippers = {}
     for frame in range(scene.frame_end):
-        action = {}
         update_active_grippers(grippers, active_grippers, cloth, frame)
-
-        for gripper, grasped in active_grippers.items():
-            gripper_action = cipc_action(gripper, cloth, grasped, frame)
-            action = action | gripper_action
-
-        simulation.step(action)
-        cloth = import_cipc_output(paths["cipc"], frame + 1)
+        rigid_actions = [cipc_rigid_action(gripper, grasped, frame) for gripper, grasped in active_grippers.items()]
+        simulation.step(rigid_actions=rigid_actions)
+        cloth = import_cipc_output(paths["cipc"], frame + 1, cloth)
         return
 
     scene.frame_set(scene.frame_start)
@@ -128,7 +123,7 @@ def run_experiment(height_ratio, offset_ratio, run_dir=None):
 
     # no need to transform to world space because origins coincide
     targets = np.array([v.co for v in cloth_target.data.vertices])
-    final_positions = np.array([v.co for v in objects[f"sim{scene.frame_end}"].data.vertices])
+    final_positions = np.array([v.co for v in cloth.data.vertices])
 
     distances = np.linalg.norm(targets - final_positions, axis=1)
     sq_distances = distances ** 2
@@ -5,25 +5,24 @@ import sys
 import airo_blender_toolkit as abt
 import blenderproc as bproc
 import bpy
-import numpy as np
-from cipc.dirs import ensure_output_filepaths, save_dict_as_json
+from blenderproc.python.types.MaterialUtility import Material
 from cipc.materials.penava import materials_by_name
-from cipc.simulator import SimulationCIPC
 
-from cloth_manipulation.folds import BezierFoldTrajectory, SideFold, SleeveFold
-from cloth_manipulation.losses import mean_distance
-from cloth_manipulation.scene import setup_camera_topdown, setup_enviroment_texture, setup_ground, setup_shirt_material
+from cloth_manipulation.folds import BezierFoldTrajectory, FoldSequence, SideFold, SleeveFold
+from cloth_manipulation.mesh_cache import make_shirt
+from cloth_manipulation.pipeline import MODES, FoldPipeline, setup_scene
+from cloth_manipulation.scene import setup_shirt_material
 
+# Names of the objects that setup() creates and the keypoints of the shirt. A persistent worker reloads the scene
+# that setup() made before every run, so the runs look their objects up again by name.
+SETUP = {}
 
-def fold_sides(height_ratio=0.8, tilt_angle=20, run_dir=None):
-    # 1. Setting up the scene
-    bproc.init()
-
-    ground = setup_ground()
-    setup_camera_topdown()
-    setup_enviroment_texture()
 
+def setup(dress=True):
+    """Build everything that does not depend on the run parameters once, see cloth_manipulation.workers."""
+    bproc.init()
     cloth_material = materials_by_name["cotton penava"]
+    ground = setup_scene(dress)
 
     dir_path = os.path.dirname(os.path.realpath(__file__))
     fold_shirt_path = os.path.join(dir_path, "shirt_folded_sleeves.obj")
@@ -35,11 +34,9 @@ def fold_sides(height_ratio=0.8, tilt_angle=20, run_dir=None):
     shirt_material = setup_shirt_material(shirt)
 
     # Use keypoints from original shirt -> assume keypoints detected only once
-    original_shirt = abt.PolygonalShirt()
+    # Placed at ground offset + cloth offset
+    original_shirt = make_shirt(minimum_triangle_density=20000, z_offset=2.0 * cloth_material.thickness)
     original_shirt_obj = original_shirt.blender_obj
-    abt.triangulate_blender_object(original_shirt_obj, minimum_triangle_density=20000)
-    original_shirt_obj.location.z = 2.0 * cloth_material.thickness  # ground offset + cloth offset
-    original_shirt.persist_transformation_into_mesh()
     original_shirt.visualize_keypoints(radius=0.01)
     keypoints = {name: coord[0] for name, coord in original_shirt.keypoints_3D.items()}
     original_shirt_obj.hide_viewport = True
@@ -48,29 +45,55 @@ def fold_sides(height_ratio=0.8, tilt_angle=20, run_dir=None):
     left_sleeve = SleeveFold(keypoints, "left")
     right_sleeve = SleeveFold(keypoints, "right")
     left_side_top = SideFold(keypoints, "left", "top")
+    right_side_top = SideFold(keypoints, "right", "top")
+
+    target_sequence = FoldSequence(
+        [
+            (left_sleeve, 2.0 * cloth_material.thickness),
+            (right_sleeve, 2.0 * cloth_material.thickness),
+            (left_side_top, 3.0 * cloth_material.thickness),
+            (right_side_top, 3.0 * cloth_material.thickness),
+        ]
+    )
+
+    target = target_sequence.make_target_mesh(original_shirt_obj)
+    target.hide_viewport = False  # Keep final target visible because we need its vertices for loss calculation
+
+    SETUP.update(
+        ground=ground.blender_obj.name,
+        shirt=shirt_obj.name,
+        shirt_material=shirt_material.blender_obj.name,
+        target=target.name,
+        keypoints=keypoints,
+    )
+
+
+def fold_sides(height_ratio=0.8, tilt_angle=20, run_dir=None, mode="full"):
+    config = {"height_ratio": height_ratio, "tilt_angle": tilt_angle}
+    pipeline = FoldPipeline(run_dir, config, mode)
+
+    # 1. Looking up the scene of setup()
+    cloth_material = materials_by_name["cotton penava"]
+    objects = bpy.data.objects
+    ground_obj = objects[SETUP["ground"]]
+    shirt_obj = objects[SETUP["shirt"]]
+    target = objects[SETUP["target"]]
+    shirt_material = Material(bpy.data.materials[SETUP["shirt_material"]])
+
+    keypoints = SETUP["keypoints"]
+    left_side_top = SideFold(keypoints, "left", "top")
     left_side_bottom = SideFold(keypoints, "left", "bottom")
     right_side_top = SideFold(keypoints, "right", "top")
     right_side_bottom = SideFold(keypoints, "right", "bottom")
 
     # Visualizing the fold lines
-    fold_line_visualization_lengths = [
-        (left_side_top.fold_line(), 0.7, 0.05),
-        (right_side_top.fold_line(), 0.05, 0.7),
-    ]
-    for fold_line, forward, backward in fold_line_visualization_lengths:
-        abt.visualize_line(*fold_line, length_forward=forward, length_backward=backward, color=abt.colors.red)
-
-    target_sequence = [
-        (left_sleeve, 2.0 * cloth_material.thickness),
-        (right_sleeve, 2.0 * cloth_material.thickness),
-        (left_side_top, 3.0 * cloth_material.thickness),
-        (right_side_top, 3.0 * cloth_material.thickness),
-    ]
-
-    target = original_shirt.blender_obj
-    for fold, thickness in target_sequence:
-        target = fold.make_target_mesh(target, cloth_thickness=thickness)
-    target.hide_viewport = False  # Keep final target visible because we need its vertices for loss calculation
+    if "dress" in pipeline:
+        fold_line_visualization_lengths = [
+            (left_side_top.fold_line(), 0.7, 0.05),
+            (right_side_top.fold_line(), 0.05, 0.7),
+        ]
+        for fold_line, forward, backward in fold_line_visualization_lengths:
+            abt.visualize_line(*fold_line, length_forward=forward, length_backward=backward, color=abt.colors.red)
 
     left_side = [left_side_top, left_side_bottom]
     right_side = [right_side_top, right_side_bottom]
@@ -101,70 +124,25 @@ def fold_sides(height_ratio=0.8, tilt_angle=20, run_dir=None):
             fold_trajectory = BezierFoldTrajectory(fold, height_ratio, angle, end_height=0.05)
             gripper = abt.BlockGripper()
             abt.keyframe_trajectory(gripper.gripper_obj, fold_trajectory, frame, frame + frames_per_fold_step)
-            bpy.ops.object.paths_range_update()
-            bpy.ops.object.paths_calculate(start_frame=scene.frame_start, end_frame=scene.frame_end)
             grippers.append(gripper)
-            abt.visualize_path(fold_trajectory.path, color=abt.colors.orange, radius=0.005)
-            # abt.visualize_transform(fold_trajectory.pose(0.0))
+            if "dress" in pipeline:
+                bpy.ops.object.paths_range_update()
+                bpy.ops.object.paths_calculate(start_frame=scene.frame_start, end_frame=scene.frame_end)
+                abt.visualize_path(fold_trajectory.path, color=abt.colors.orange, radius=0.005)
+                # abt.visualize_transform(fold_trajectory.pose(0.0))
         frame += frames_per_fold_step + frames_between_fold_steps
 
-    config = {"height_ratio": height_ratio, "tilt_angle": tilt_angle}
-    filepaths = ensure_output_filepaths(run_dir, config=config)
-
-    # Running the simulation
-    simulation = SimulationCIPC(filepaths, 25)
-    simulation.add_cloth(shirt.blender_obj, cloth_material)
-    simulation.add_collider(ground.blender_obj, friction_coefficient=0.8)
-    simulation.initialize_cipc()
-
-    simulated_shirt = shirt.blender_obj
-
-    for frame in range(scene.frame_start, scene.frame_end):
-        scene.frame_set(frame)
-        action = {}
-        for gripper in grippers:
-            action |= gripper.action(simulated_shirt)
-        simulation.step(action)
-        simulated_shirt = simulation.blender_objects_output[shirt_obj.name][frame + 1]
-        scene.frame_set(frame + 1)
-
-    # 4. Calculating the loss
-    print(target.name)
-    print(simulated_shirt.name)
-    print(shirt.blender_obj.name)
-
-    targets = np.array([target.matrix_world @ v.co for v in target.data.vertices])
-    simulated_positions = np.array([simulated_shirt.matrix_world @ v.co for v in simulated_shirt.data.vertices])
-    initial_positions = np.array([shirt.blender_obj.matrix_world @ v.co for v in shirt.blender_obj.data.vertices])
-
-    losses = {
-        "mean_distance": mean_distance(targets, simulated_positions),
-    }
-
-    mean_distance_initial = mean_distance(targets, initial_positions)
-
-    print("Mean distance (initial):", mean_distance_initial)
-    print("Mean distance (result):", losses["mean_distance"])
-    print("Mean distance (target-self):", mean_distance(targets, targets))
-
-    save_dict_as_json(filepaths["losses"], losses)
-
-    # 5. Visualization
-    for shirt_obj in simulation.blender_objects_output[shirt.blender_obj.name].values():
-        shirt_obj.data.materials.append(shirt_material.blender_obj)
-
-    scene.frame_set(simulation_steps)
-    objects_to_hide = [ground.blender_obj, shirt.blender_obj, target]
-
-    for object in objects_to_hide:
-        object.hide_viewport = True
-        object.hide_render = True
+    # 2. Running the simulation
+    simulated_shirt = pipeline.simulate(shirt_obj, ground_obj, cloth_material, grippers)
 
-    scene.cycles.adaptive_threshold = 0.1
-    scene.render.filepath = os.path.join(filepaths["run"], "result.png")
+    # 3. Calculating the loss
+    losses = pipeline.score(target, simulated_shirt, shirt_obj)
 
-    bpy.ops.wm.save_as_mainfile(filepath=filepaths["blend"])
-    bpy.ops.render.render(write_still=True)
+    # 4. Visualization
+    objects_to_hide = [ground_obj, shirt_obj, target]
+    pipeline.dress_result(shirt_obj, shirt_material, objects_to_hide)
+    pipeline.persist(simulated_shirt)
+    pipeline.render()
 
     return losses
 
@@ -177,9 +155,11 @@ if __name__ == "__main__":
         parser.add_argument("-ht", "--height_ratio", dest="height_ratio", type=float)
         parser.add_argument("-ta", "--tilt_angle", dest="tilt_angle", type=float)
         parser.add_argument("-d", "--dir", dest="run_dir", metavar="RUN_DIR")
+        parser.add_argument("-m", "--mode", default="full", choices=MODES.keys(), help="Which stages to run.")
         args = parser.parse_known_args(argv)[0]
 
         print(args.run_dir)
-        fold_sides(args.height_ratio, args.tilt_angle, args.run_dir)
+        setup(dress="dress" in MODES[args.mode])
+        fold_sides(args.height_ratio, args.tilt_angle, args.run_dir, args.mode)
     else:
         print("Please rerun with arguments.")
@@ -1,44 +1,111 @@
 import argparse
 import copy
-import os
 import sys
 
 import airo_blender_toolkit as abt
 import blenderproc as bproc
 import bpy
-import numpy as np
-from cipc.dirs import ensure_output_filepaths, save_dict_as_json
+from blenderproc.python.types.MaterialUtility import Material
 from cipc.materials.penava import materials_by_name
-from cipc.simulator import SimulationCIPC
 
 from cloth_manipulation.folds import BezierFoldTrajectory, SleeveFold
-from cloth_manipulation.losses import mean_distance
-from cloth_manipulation.scene import setup_camera_topdown, setup_enviroment_texture, setup_ground, setup_shirt_material
+from cloth_manipulation.grippers import TrajectoryGripper
+from cloth_manipulation.mesh_cache import make_shirt
+from cloth_manipulation.pipeline import MODES, FoldPipeline, setup_scene
+from cloth_manipulation.scene import setup_shirt_material
+
+SHAPES = [
+    {},
+    {"shoulder_height": 0.94, "sleeve_angle": 30.0},
+    {
+        "bottom_width": 0.75,
+        "neck_width": 0.25,
+        "neck_depth": 0.1,
+        "shoulder_width": 0.68,
+        "shoulder_height": 0.95,
+        "sleeve_width_start": 0.3,
+        "sleeve_width_end": 0.25,
+        "sleeve_length": 0.22,
+        "sleeve_angle": 5.0,
+    },
+]
+
+# The cloth material, the names of the objects that setup() creates and the keypoints of the shirt. A persistent
+# worker reloads the scene that setup() made before every run, so the runs look their objects up again by name.
+SETUP = {}
+
+
+def make_cloth_material(index):
+    if index == 0:
+        return materials_by_name["cotton penava"]
+    if index == 1:
+        return materials_by_name["wool penava"]
+    if index == 2:
+        return materials_by_name["polyester penava"]
+    if index == 3:
+        cloth_material = copy.deepcopy(materials_by_name["cotton penava"])
+        cloth_material.thickness /= 5.0
+        return cloth_material
+    if index == 4:
+        cloth_material = copy.deepcopy(materials_by_name["cotton penava"])
+        cloth_material.thickness *= 5.0
+        return cloth_material
+    raise ValueError(f"Unknown cloth material {index}, expected 0 to 4.")
+
+
+def setup(cloth_material=0, shape=0, dress=True):
+    """Build the scene and the shirt once, see cloth_manipulation.workers.
+
+    Args:
+        cloth_material (int): index of the cloth material, see make_cloth_material.
+        shape (int): index of the shirt shape in SHAPES.
+        dress (bool): whether the results will be dressed, which needs the HDRI lighting.
+    """
+    bproc.init()
+    material = make_cloth_material(cloth_material)
+    print(material.name)
+    ground = setup_scene(dress)
+
+    # Placed at ground offset + cloth offset
+    shirt = make_shirt(SHAPES[shape], minimum_triangle_density=20000, z_offset=2.0 * material.thickness)
+    # shirt.visualize_keypoints(radius=0.01)
+    shirt_material = setup_shirt_material(shirt)
 
+    keypoints = {name: coord[0] for name, coord in shirt.keypoints_3D.items()}
+    left_sleeve = SleeveFold(keypoints, "left")
+    # The 2.0 below is because C-IPC offsets this thickness on both side, might need to halve this later.
+    target = left_sleeve.make_target_mesh(shirt.blender_obj, cloth_thickness=2.0 * material.thickness)
 
-def fold_sleeve(shirt, cloth_material, height_ratio=0.8, tilt_angle=20, friction_coefficient=0.5, run_dir=None):
-    # 1. Setting up the scene
+    SETUP.update(
+        cloth_material=material,
+        ground=ground.blender_obj.name,
+        shirt=shirt.blender_obj.name,
+        shirt_material=shirt_material.blender_obj.name,
+        target=target.name,
+        keypoints=keypoints,
+    )
 
-    ground = setup_ground()
-    setup_camera_topdown()
-    setup_enviroment_texture()
 
-    # shirt.visualize_keypoints(radius=0.01)
+def fold_sleeve(*, height_ratio=0.8, tilt_angle=20, friction_coefficient=0.5, run_dir=None, mode="full"):
+    config = {"height_ratio": height_ratio, "tilt_angle": tilt_angle}
+    pipeline = FoldPipeline(run_dir, config, mode)
 
-    shirt_material = setup_shirt_material(shirt)
+    # 1. Looking up the scene of setup()
+    cloth_material = SETUP["cloth_material"]
+    ground_obj = bpy.data.objects[SETUP["ground"]]
+    shirt_obj = bpy.data.objects[SETUP["shirt"]]
+    target = bpy.data.objects[SETUP["target"]]
+    shirt_material = Material(bpy.data.materials[SETUP["shirt_material"]])
 
-    keypoints = {name: coord[0] for name, coord in shirt.keypoints_3D.items()}
-    left_sleeve = SleeveFold(keypoints, "left")
+    left_sleeve = SleeveFold(SETUP["keypoints"], "left")
 
     # Visualizing the fold lines
-    fold_line_visualization_lengths = [
-        (left_sleeve.fold_line(), 0.3, 0.1),
-    ]
-    for fold_line, forward, backward in fold_line_visualization_lengths:
-        abt.visualize_line(*fold_line, length_forward=forward, length_backward=backward, color=abt.colors.red)
-
-    # The 2.0 below is because C-IPC offsets this thickness on both side, might need to halve this later.
-    target = left_sleeve.make_target_mesh(shirt.blender_obj, cloth_thickness=2.0 * cloth_material.thickness)
+    if "dress" in pipeline:
+        fold_line_visualization_lengths = [
+            (left_sleeve.fold_line(), 0.3, 0.1),
+        ]
+        for fold_line, forward, backward in fold_line_visualization_lengths:
+            abt.visualize_line(*fold_line, length_forward=forward, length_backward=backward, color=abt.colors.red)
 
     fold_steps = [[left_sleeve]]
 
@@ -59,73 +126,28 @@ def fold_sleeve(shirt, cloth_material, height_ratio=0.8, tilt_angle=20, friction
         for fold in fold_step:
             angle = tilt_angle if fold.side == "right" else -1 * tilt_angle
             fold_trajectory = BezierFoldTrajectory(fold, height_ratio, angle, end_height=0.05)
-            gripper = abt.BlockGripper()
-            abt.keyframe_trajectory(gripper.gripper_obj, fold_trajectory, frame, frame + frames_per_fold_step)
-            bpy.ops.object.paths_range_update()
-            bpy.ops.object.paths_calculate(start_frame=scene.frame_start, end_frame=scene.frame_end)
-            grippers.append(gripper)
-            abt.visualize_path(fold_trajectory.path, color=abt.colors.orange, radius=0.005)
-            # abt.visualize_transform(fold_trajectory.pose(0.0))
+            grippers.append(TrajectoryGripper(fold_trajectory, frame, frame + frames_per_fold_step))
+            if "dress" in pipeline:
+                # The gripper object is only animated to visualize the motion, the actions are computed analytically.
+                gripper = abt.BlockGripper()
+                abt.keyframe_trajectory(gripper.gripper_obj, fold_trajectory, frame, frame + frames_per_fold_step)
+                bpy.ops.object.paths_range_update()
+                bpy.ops.object.paths_calculate(start_frame=scene.frame_start, end_frame=scene.frame_end)
+                abt.visualize_path(fold_trajectory.path, color=abt.colors.orange, radius=0.005)
+                # abt.visualize_transform(fold_trajectory.pose(0.0))
         frame += frames_per_fold_step + frames_between_fold_steps
 
-    config = {"height_ratio": height_ratio, "tilt_angle": tilt_angle}
-    filepaths = ensure_output_filepaths(run_dir, config=config)
-
-    # Running the simulation
-    simulation = SimulationCIPC(filepaths, 25)
-    simulation.friction_coefficient = friction_coefficient
-    simulation.add_cloth(shirt.blender_obj, cloth_material)
-    simulation.add_collider(ground.blender_obj, friction_coefficient=0.8)
-    simulation.initialize_cipc()
-
-    shirt_obj = shirt.blender_obj
-    simulated_shirt = shirt.blender_obj
-
-    for frame in range(scene.frame_start, scene.frame_end):
-        scene.frame_set(frame)
-        action = {}
-        for gripper in grippers:
-            action |= gripper.action(simulated_shirt)
-        simulation.step(action)
-        simulated_shirt = simulation.blender_objects_output[shirt_obj.name][frame + 1]
-        scene.frame_set(frame + 1)
-
-    # 4. Calculating the loss
-    print(target.name)
-    print(simulated_shirt.name)
-    print(shirt.blender_obj.name)
-
-    targets = np.array([target.matrix_world @ v.co for v in target.data.vertices])
-    simulated_positions = np.array([simulated_shirt.matrix_world @ v.co for v in simulated_shirt.data.vertices])
-    initial_positions = np.array([shirt.blender_obj.matrix_world @ v.co for v in shirt.blender_obj.data.vertices])
-
-    losses = {
-        "mean_distance": mean_distance(targets, simulated_positions),
-    }
-
-    mean_distance_initial = mean_distance(targets, initial_positions)
-
-    print("Mean distance (initial):", mean_distance_initial)
-    print("Mean distance (result):", losses["mean_distance"])
-
-    save_dict_as_json(filepaths["losses"], losses)
-
-    # 5. Visualization
-    for shirt_obj in simulation.blender_objects_output[shirt.blender_obj.name].values():
-        shirt_obj.data.materials.append(shirt_material.blender_obj)
-
-    scene.frame_set(simulation_steps)
-    objects_to_hide = [ground.blender_obj, shirt.blender_obj, target]
-
-    for object in objects_to_hide:
-        object.hide_viewport = True
-        object.hide_render = True
+    # 2. Running the simulation
+    simulated_shirt = pipeline.simulate(shirt_obj, ground_obj, cloth_material, grippers, friction_coefficient)
 
-    scene.cycles.adaptive_threshold = 0.1
-    scene.render.filepath = os.path.join(filepaths["run"], "result.png")
+    # 3. Calculating the loss
+    losses = pipeline.score(target, simulated_shirt, shirt_obj)
 
-    bpy.ops.wm.save_as_mainfile(filepath=filepaths["blend"])
-    bpy.ops.render.render(write_still=True)
+    # 4. Visualization
+    objects_to_hide = [ground_obj, shirt_obj, target]
+    pipeline.dress_result(shirt_obj, shirt_material, objects_to_hide)
+    pipeline.persist(simulated_shirt)
+    pipeline.render()
 
     return losses
 
@@ -138,8 +160,9 @@ if __name__ == "__main__":
         parser.add_argument("-ht", "--height_ratio", dest="height_ratio", type=float)
         parser.add_argument("-ta", "--tilt_angle", dest="tilt_angle", type=float)
         parser.add_argument("-d", "--dir", dest="run_dir", metavar="RUN_DIR")
-        parser.add_argument("-cm", "--cloth_material", type=int)
-        parser.add_argument("-sh", "--shape", type=int)
+        parser.add_argument("-m", "--mode", default="full", choices=MODES.keys(), help="Which stages to run.")
+        parser.add_argument("-cm", "--cloth_material", default=0, type=int)
+        parser.add_argument("-sh", "--shape", default=0, type=int)
         parser.add_argument("-fc", "--friction_coefficient", default=0.5, type=float)
 
         args = parser.parse_known_args(argv)[0]
@@ -148,45 +171,13 @@ if __name__ == "__main__":
         print(args.cloth_material)
         print(args.shape)
 
-        bproc.init()
-
-        if args.cloth_material == 0:
-            cloth_material = materials_by_name["cotton penava"]
-        if args.cloth_material == 1:
-            cloth_material = materials_by_name["wool penava"]
-        if args.cloth_material == 2:
-            cloth_material = materials_by_name["polyester penava"]
-        if args.cloth_material == 3:
-            cloth_material = copy.deepcopy(materials_by_name["cotton penava"])
-            cloth_material.thickness /= 5.0
-        if args.cloth_material == 4:
-            cloth_material = copy.deepcopy(materials_by_name["cotton penava"])
-            cloth_material.thickness *= 5.0
-
-        print(cloth_material.name)
-
-        if args.shape == 0:
-            shirt = abt.PolygonalShirt()
-        if args.shape == 1:
-            shirt = abt.PolygonalShirt(shoulder_height=0.94, sleeve_angle=30.0)
-        if args.shape == 2:
-            shirt = abt.PolygonalShirt(
-                bottom_width=0.75,
-                neck_width=0.25,
-                neck_depth=0.1,
-                shoulder_width=0.68,
-                shoulder_height=0.95,
-                sleeve_width_start=0.3,
-                sleeve_width_end=0.25,
-                sleeve_length=0.22,
-                sleeve_angle=5.0,
-            )
-
-        shirt_obj = shirt.blender_obj
-        abt.triangulate_blender_object(shirt_obj, minimum_triangle_density=20000)
-        shirt_obj.location.z = 2.0 * cloth_material.thickness  # ground offset + cloth offset
-        shirt.persist_transformation_into_mesh()
-
-        fold_sleeve(shirt, cloth_material, args.height_ratio, args.tilt_angle, args.friction_coefficient, args.run_dir)
+        setup(args.cloth_material, args.shape, dress="dress" in MODES[args.mode])
+        fold_sleeve(
+            height_ratio=args.height_ratio,
+            tilt_angle=args.tilt_angle,
+            friction_coefficient=args.friction_coefficient,
+            run_dir=args.run_dir,
+            mode=args.mode,
+        )
     else:
         print("Please rerun with arguments.")
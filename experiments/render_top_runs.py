@@ -0,0 +1,28 @@
+"""Render the best runs of a local sweep in one Blender session.
+
+The runs must have saved their final state, which only the save_state stage does. Run the sweep in the deferred mode
+for this, e.g. `python run_fold_local.py -- fold_sleeves/fold_sleeves.py output -m deferred`. Runs without a saved
+state are skipped.
+"""
+import argparse
+import sys
+
+import blenderproc as bproc
+
+from cloth_manipulation.render import RENDER_PRESETS, render_top_runs
+
+if __name__ == "__main__":
+    arg_start = sys.argv.index("--") + 1 if "--" in sys.argv else len(sys.argv)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "output_dir",
+        help="Directory of a local sweep with results.sqlite, run with -m deferred so the runs saved their state.",
+    )
+    parser.add_argument("-k", "--top_k", type=int, default=20, help="Amount of runs to render, best first.")
+    parser.add_argument("-p", "--preset", default="thumbnail", choices=RENDER_PRESETS.keys())
+    parser.add_argument("-at", "--adaptive_threshold", type=float, help="Overrides the threshold of the preset.")
+    parser.add_argument("-l", "--loss", default="mean_distance", help="The loss to rank the runs by.")
+    args = parser.parse_known_args(sys.argv[arg_start:])[0]
+
+    bproc.init()
+    render_top_runs(args.output_dir, args.top_k, args.preset, args.adaptive_threshold, args.loss)
@@ -0,0 +1,37 @@
+import argparse
+import sys
+
+from cloth_manipulation.sweep import height_ratio_tilt_angle_grid, mirror_to_wandb, run_sweep
+
+if __name__ == "__main__":
+    if "--" in sys.argv:
+        arg_start = sys.argv.index("--") + 1
+        argv = sys.argv[arg_start:]
+        parser = argparse.ArgumentParser()
+        parser.add_argument("script", help="The python script of the experiment.")
+        parser.add_argument("output_dir", help="Directory for the run outputs and results.sqlite.")
+        parser.add_argument("-cpr", "--cores_per_run", type=int, default=1, help="Cores per Blender process.")
+        parser.add_argument("-w", "--max_workers", type=int, help="Concurrent runs, default: cores / cores_per_run.")
+        parser.add_argument("-p", "--wandb_project", help="If set, the results are mirrored to this wandb project.")
+        parser.add_argument(
+            "--lease",
+            type=float,
+            help="Seconds after which points claimed by launchers on other hosts are run again.",
+        )
+        args, extra_args = parser.parse_known_args(argv)
+
+        grid = height_ratio_tilt_angle_grid()
+        print("Combinations:", len(grid))
+
+        run_sweep(
+            args.script,
+            grid,
+            args.output_dir,
+            args.cores_per_run,
+            args.max_workers,
+            extra_args=extra_args,
+            lease=args.lease,
+        )
+
+        if args.wandb_project is not None:
+            mirror_to_wandb(f"{args.output_dir}/results.sqlite", args.wandb_project)
@@ -1,5 +1,6 @@
 import argparse
 import json
+import multiprocessing
 import os
 import shutil
 import subprocess
@@ -31,16 +32,23 @@ def log_results(height_ratio, tilt_angle, output_dir):
         losses = json.load(f)
     log = log | losses
     wandb.log(log)
-    wandb.log({"result": wandb.Image(os.path.join(output_dir, "result.png"))})
 
+    # Runs in the metrics and deferred modes are not rendered, see cloth_manipulation.render.
+    image_path = os.path.join(output_dir, "result.png")
+    if os.path.exists(image_path):
+        wandb.log({"result": wandb.Image(image_path)})
 
-def run_wandb(script, keep_output=False):
+
+def run_wandb(script, keep_output=False, pool=None):
     with wandb.init() as run:
         height_ratio, tilt_angle = parse_parameters(run)
         output_dir = make_output_dir(run.name, height_ratio, tilt_angle)
 
-        runCommand = f"blender -b -P {script} -- -ht {height_ratio} -ta {tilt_angle} -d '{output_dir}'"
-        subprocess.run([runCommand], shell=True, stdout=subprocess.DEVNULL)
+        if pool is None:
+            runCommand = f"blender -b -P {script} -- -ht {height_ratio} -ta {tilt_angle} -d '{output_dir}'"
+            subprocess.run([runCommand], shell=True, stdout=subprocess.DEVNULL)
+        else:
+            pool.submit(height_ratio=height_ratio, tilt_angle=tilt_angle, run_dir=output_dir).result()
 
         log_results(height_ratio, tilt_angle, output_dir)
 
@@ -48,6 +56,21 @@ def run_wandb(script, keep_output=False):
             shutil.rmtree(output_dir)
 
 
+def run_agent(args, count):
+    pool = None
+    if args.function is not None:
+        from cloth_manipulation.workers import BlenderWorkerPool
+
+        # Blender startup and the script's setup() are paid once per agent instead of once per run.
+        pool = BlenderWorkerPool(args.script, args.function)
+
+    wandb_function = partial(run_wandb, script=args.script, keep_output=args.keep_output, pool=pool)
+    wandb.agent(args.sweep_id, project=args.project, function=wandb_function, count=count)
+
+    if pool is not None:
+        pool.close()
+
+
 if __name__ == "__main__":
     if "--" in sys.argv:
         arg_start = sys.argv.index("--") + 1
@@ -62,6 +85,30 @@ if __name__ == "__main__":
             action=argparse.BooleanOptionalAction,
             help="If not set all simulation output will be removed after the run to save memory.",
         )
+        parser.add_argument(
+            "-f",
+            "--function",
+            help="Run the experiments in a persistent Blender worker that calls this function of the script.",
+        )
+        parser.add_argument(
+            "-n",
+            "--n_workers",
+            type=int,
+            default=1,
+            help="Amount of wandb agents that run in parallel, each with its own persistent Blender worker.",
+        )
         args = parser.parse_known_args(argv)[0]
-        wandb_function = partial(run_wandb, script=args.script, keep_output=args.keep_output)
-        wandb.agent(args.sweep_id, project=args.project, function=wandb_function, count=args.count)
+
+        if args.n_workers == 1:
+            run_agent(args, args.count)
+        else:
+            # wandb keeps the active run in process-wide state, so parallel agents need their own process.
+            counts = [None] * args.n_workers
+            if args.count is not None:
+                counts = [len(range(i, args.count, args.n_workers)) for i in range(args.n_workers)]
+            context = multiprocessing.get_context("spawn")
+            agents = [context.Process(target=run_agent, args=(args, count)) for count in counts if count != 0]
+            for agent in agents:
+                agent.start()
+            for agent in agents:
+                agent.join()
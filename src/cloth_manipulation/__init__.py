@@ -1,21 +1,39 @@
-from cloth_manipulation.losses import distances, mean_distance, mean_squared_distance, root_mean_squared_distance
-from cloth_manipulation.scene import (
-    setup_camera_perspective,
-    setup_camera_topdown,
-    setup_enviroment_texture,
-    setup_ground,
-    setup_shirt_material,
-)
+"""Blender utils for cloth manipulation, the public names are imported lazily (PEP 562)."""
+import importlib
 
-# Prevents F401 unused imports
-__all__ = (
-    "distances",
-    "mean_distance",
-    "mean_squared_distance",
-    "root_mean_squared_distance",
-    "setup_ground",
-    "setup_camera_topdown",
-    "setup_camera_perspective",
-    "setup_shirt_material",
-    "setup_enviroment_texture",
-)
+_LAZY_ATTRIBUTES = {
+    "distances": "losses",
+    "mean_distance": "losses",
+    "mean_squared_distance": "losses",
+    "root_mean_squared_distance": "losses",
+    "squared_distances": "losses",
+    "batch_mean_distance": "losses",
+    "batch_mean_squared_distance": "losses",
+    "batch_root_mean_squared_distance": "losses",
+    "NearestNeighbourIndex": "losses",
+    "nearest_distances": "losses",
+    "one_sided_mean_distance": "losses",
+    "chamfer_distance": "losses",
+    "hausdorff_distance": "losses",
+    "setup_ground": "scene",
+    "setup_camera_topdown": "scene",
+    "setup_camera_perspective": "scene",
+    "setup_shirt_material": "scene",
+    "setup_enviroment_texture": "scene",
+}
+
+__all__ = tuple(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(f"{__name__}.{_LAZY_ATTRIBUTES[name]}")
+    value = getattr(module, name)
+    globals()[name] = value  # Later lookups no longer go through __getattr__.
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,138 @@
+"""Import C-IPC output into Blender without the OBJ import operator."""
+import glob
+import itertools
+import os
+import re
+
+import numpy as np
+
+from cloth_manipulation.frame_store import FrameStore, FrameStoreWriter
+from cloth_manipulation.mesh import add_shape_key_frames, make_mesh_object, set_vertex_coordinates
+
+
+def read_obj(path):
+    """Read the vertices and triangles of an OBJ file.
+
+    Returns:
+        tuple: (V, 3) float64 vertices and (F, 3) int32 triangles, with zero-based indices.
+    """
+    vertex_lines = []
+    face_lines = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith("v "):
+                vertex_lines.append(line[2:])
+            elif line.startswith("f "):
+                face_lines.append(line[2:])
+
+    vertices = np.array(" ".join(vertex_lines).split(), dtype=np.float64).reshape(-1, 3)
+
+    # Only keep the vertex index of "v/vt/vn" face elements.
+    face_text = re.sub(r"/\S*", "", " ".join(face_lines))
+    faces = np.array(face_text.split(), dtype=np.int32)
+    if len(faces) != 3 * len(face_lines):
+        raise ValueError(f"{path} contains faces that are not triangles.")
+
+    return vertices, faces.reshape(-1, 3) - 1
+
+
+def cipc_to_blender_coordinates(vertices):
+    """Convert C-IPC's Y-up coordinates to Blender's Z-up, the inverse of cipc.to_Vector3d."""
+    return np.stack([vertices[:, 0], -vertices[:, 2], vertices[:, 1]], axis=1)
+
+
+def read_cipc_frame(path, n_ground_vertices=4):
+    """Read the cloth of one C-IPC output file.
+
+    Args:
+        path (str): path to a shell<frame>.obj file.
+        n_ground_vertices (int): number of vertices of the objects that were added to C-IPC before the cloth.
+
+    Returns:
+        tuple: (N, 3) cloth vertex positions in Blender coordinates and (F, 3) cloth triangles.
+    """
+    vertices, triangles = read_obj(path)
+    positions = cipc_to_blender_coordinates(vertices[n_ground_vertices:])
+    cloth_triangles = triangles[np.all(triangles >= n_ground_vertices, axis=1)] - n_ground_vertices
+    return positions, cloth_triangles
+
+
+def cipc_output_files(cipc_output_dir):
+    """The (frame, path) pairs of the shell<frame>.obj files in a C-IPC output directory, ordered by frame."""
+    files = []
+    for path in glob.glob(os.path.join(cipc_output_dir, "shell*.obj")):
+        match = re.fullmatch(r"shell(\d+)\.obj", os.path.basename(path))
+        if match is not None:
+            files.append((int(match.group(1)), path))
+    return sorted(files)
+
+
+def convert_cipc_output(cipc_output_dir, store_path, n_ground_vertices=4, compress=False):
+    """Convert the OBJ files of a C-IPC output directory to a frame store, see cloth_manipulation.frame_store."""
+    files = cipc_output_files(cipc_output_dir)
+    if not files:
+        raise FileNotFoundError(f"No C-IPC output found in {cipc_output_dir}.")
+
+    positions, triangles = read_cipc_frame(files[0][1], n_ground_vertices)
+    metadata = {"start_frame": files[0][0], "frame_numbers": [frame for frame, _ in files]}
+    writer = FrameStoreWriter(store_path, triangles, len(positions), len(files), compress=compress, metadata=metadata)
+    with writer:
+        writer.append(positions)
+        for _, path in files[1:]:
+            writer.append(read_cipc_frame(path, n_ground_vertices)[0])
+
+    return FrameStore(store_path)
+
+
+def load_cloth_frames(source, n_ground_vertices=4):
+    """The topology and frames of a C-IPC output directory or a frame store.
+
+    Returns:
+        tuple: (F, 3) triangles, an iterable of (N, 3) positions that is read lazily and the C-IPC frame number of
+            each position.
+    """
+    if os.path.exists(os.path.join(source, "header.json")):
+        store = FrameStore(source)
+        start_frame = store.metadata.get("start_frame", 0)
+        frame_numbers = store.metadata.get("frame_numbers", list(range(start_frame, start_frame + len(store))))
+        return store.triangles, store, frame_numbers
+
+    files = cipc_output_files(source)
+    if not files:
+        raise FileNotFoundError(f"No C-IPC output found in {source}.")
+
+    triangles = read_cipc_frame(files[0][1], n_ground_vertices)[1]
+    frames = (read_cipc_frame(path, n_ground_vertices)[0] for _, path in files)
+    return triangles, frames, [frame for frame, _ in files]
+
+
+def import_cipc_frame(cipc_output_dir, frame, cloth=None, n_ground_vertices=4, name="sim"):
+    """Import one frame of C-IPC output.
+
+    When cloth is given, its vertices are overwritten in place with foreach_set, so stepping through a simulation
+    reuses one Blender object instead of creating one per frame.
+
+    Returns:
+        bpy.types.Object: the cloth object.
+    """
+    path = os.path.join(cipc_output_dir, f"shell{frame}.obj")
+    positions, triangles = read_cipc_frame(path, n_ground_vertices)
+    if cloth is None:
+        return make_mesh_object(name, positions, triangles)
+
+    set_vertex_coordinates(cloth.data, positions)
+    return cloth
+
+
+def import_cipc_animation(source, n_ground_vertices=4, name="sim"):
+    """Import all frames of a C-IPC output directory or frame store as a single object animated with shape keys.
+
+    The shape keys are named and keyframed after the C-IPC frame numbers, also when only every n-th frame was written.
+    """
+    triangles, frames, frame_numbers = load_cloth_frames(source, n_ground_vertices)
+    frames = iter(frames)
+    first_positions = next(frames)
+
+    cloth = make_mesh_object(name, first_positions, triangles)
+    add_shape_key_frames(cloth, itertools.chain([first_positions], frames), frame_numbers=frame_numbers)
+    return cloth
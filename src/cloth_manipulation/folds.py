@@ -1,22 +1,93 @@
+import functools
+import inspect
 from abc import ABC, abstractmethod
 
-import airo_blender_toolkit as abt
-import bpy
 import numpy as np
-from airo_blender_toolkit.path import BezierPath, TiltedEllipticalArcPath
-from airo_blender_toolkit.time_parametrization import MinimumJerk
-from airo_blender_toolkit.trajectory import Trajectory
-from mathutils import Matrix
+
+from cloth_manipulation.geometry import (
+    Frame,
+    fold_frame,
+    fold_vertices,
+    normalize,
+    pose_matrices,
+    reflect_vertices,
+    rotate_point,
+    slerp,
+)
+from cloth_manipulation.keypoints import Keypoints
+from cloth_manipulation.mesh import get_vertex_coordinates, set_vertex_coordinates
+from cloth_manipulation.paths import (
+    bezier_fold_control_points,
+    elliptical_arc,
+    fold_end_pose,
+    minimum_jerk,
+    quadratic_bezier,
+)
+
+
+def copy_target_object(cloth):
+    import bpy
+
+    cloth_folded = cloth.copy()
+    cloth_folded.data = cloth.data.copy()
+    bpy.context.collection.objects.link(cloth_folded)
+    cloth_folded.name = f"{cloth.name} Target"
+    return cloth_folded
+
+
+def read_only(value):
+    """Make the arrays in a (tuple of) result(s) read-only, so a cached result can not be changed by accident."""
+    if isinstance(value, tuple):
+        return tuple(read_only(v) for v in value)
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    return value
+
+
+def cached_geometry(method):
+    """Cache the result of a Fold method on the instance, until its keypoints or one of its parameters change.
+
+    The cached arrays are read-only, copy them before modifying them. Arguments are bound to the signature of the
+    method, so e.g. gripper_end_pose(), gripper_end_pose(170) and gripper_end_pose(end_angle=170) share an entry.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        key = (method.__name__, *list(arguments.arguments.values())[1:])
+        if key not in self._geometry_cache:
+            self._geometry_cache[key] = read_only(method(*arguments.args, **arguments.kwargs))
+        return self._geometry_cache[key]
+
+    return wrapper
 
 
 class Fold(ABC):
     """Base class to represent a cloth folding motion.
     A fold is derived from cloth keypoints.
+
+    The fold line and gripper poses are computed once and cached. Assigning new keypoints or changing a parameter
+    of the fold, e.g. fold.side = "right", clears the cache.
     """
 
     def __init__(self, keypoints):
         self.keypoints = keypoints
 
+    def __setattr__(self, name, value):
+        if not name.startswith("_"):
+            super().__setattr__("_geometry_cache", {})
+        super().__setattr__(name, value)
+
+    @property
+    def keypoints(self):
+        return self._keypoints
+
+    @keypoints.setter
+    def keypoints(self, keypoints):
+        self._keypoints = keypoints if isinstance(keypoints, Keypoints) else Keypoints(keypoints)
+
     @abstractmethod
     def fold_line(self):
         pass
@@ -25,28 +96,20 @@ class Fold(ABC):
     def gripper_start_pose(self):
         pass
 
-    def make_target_mesh(self, cloth, cloth_thickness=0.001):
-        cloth_folded = cloth.copy()
-        cloth_folded.data = cloth.data.copy()
-        bpy.context.collection.objects.link(cloth_folded)
-        cloth_folded.name = f"{cloth.name} Target"
-
-        origin, X = self.fold_line()
-        Z = np.array([0.0, 0.0, 1.0])
-        Y = np.cross(Z, X)
-        basis = abt.Frame.from_vectors(X, Y, Z, origin)
-        basis_inv = Matrix(np.linalg.inv(basis))
-        basis = Matrix(basis)
+    @cached_geometry
+    def gripper_end_pose(self, end_angle=170):
+        """The 4x4 pose of the gripper after rotating over the fold line by end_angle, see paths.fold_end_pose."""
+        return fold_end_pose(self.gripper_start_pose(), *self.fold_line(), end_angle=end_angle)
 
-        for v in cloth_folded.data.vertices:
-            co = v.co
-            co = basis_inv @ co
+    def fold_vertices(self, vertices, cloth_thickness=0.001, out=None):
+        """Fold an (N, 3) array of vertex positions over the fold line, see geometry.fold_vertices."""
+        return fold_vertices(vertices, *self.fold_line(), cloth_thickness=cloth_thickness, out=out)
 
-            if co.y >= 0.0:
-                co.y *= -1
-                co.z += cloth_thickness
-                co = basis @ co
-                v.co = co
+    def make_target_mesh(self, cloth, cloth_thickness=0.001):
+        cloth_folded = copy_target_object(cloth)
+        vertices = get_vertex_coordinates(cloth_folded.data)
+        self.fold_vertices(vertices, cloth_thickness, out=vertices)
+        set_vertex_coordinates(cloth_folded.data, vertices)
 
         return cloth_folded
 
@@ -57,6 +120,7 @@ class SleeveFold(Fold):
         self.angle = angle
         super().__init__(keypoints)
 
+    @cached_geometry
     def fold_line(self):
         keypoints = self.keypoints
         side = self.side
@@ -71,7 +135,7 @@ class SleeveFold(Fold):
         angle = np.deg2rad(angle)
         up = np.array([0, 0, 1])
 
-        rotated = abt.rotate_point(corner_bottom, armpit, up, angle)
+        rotated = rotate_point(corner_bottom, armpit, up, angle)
         line_direction = rotated - armpit
         line_direction /= np.linalg.norm(line_direction)
 
@@ -79,6 +143,7 @@ class SleeveFold(Fold):
 
         return point_on_line, line_direction
 
+    @cached_geometry
     def gripper_start_pose(self):
         keypoints = self.keypoints
         side = self.side
@@ -96,7 +161,7 @@ class SleeveFold(Fold):
         Z /= np.linalg.norm(Z)
         Y = np.cross(Z, X)
 
-        start_pose = abt.Frame.from_vectors(X, Y, Z, sleeve_middle)
+        start_pose = Frame.from_vectors(X, Y, Z, sleeve_middle)
 
         return start_pose
 
@@ -107,6 +172,7 @@ class SideFold(Fold):
         self.gripper_positioning = gripper_positioning
         super().__init__(keypoints)
 
+    @cached_geometry
     def fold_line(self):
         keypoints = self.keypoints
         side = self.side
@@ -119,16 +185,17 @@ class SideFold(Fold):
         bottom_right = keypoints["bottom_right"]
 
         if side == "left":
-            line_direction = (armpit_left - bottom_left).normalized()
+            line_direction = normalize(armpit_left - bottom_left)
             point_on_line = 0.75 * bottom_left + 0.25 * bottom_right
         else:
-            line_direction = (bottom_right - armpit_right).normalized()
+            line_direction = normalize(bottom_right - armpit_right)
             point_on_line = 0.25 * bottom_left + 0.75 * bottom_right
 
         line_direction /= np.linalg.norm(line_direction)
 
         return point_on_line, line_direction
 
+    @cached_geometry
     def gripper_start_pose(self):
         keypoints = self.keypoints
         side = self.side
@@ -142,8 +209,8 @@ class SideFold(Fold):
         armpit = armpit_left if side == "left" else armpit_right
         bottom = bottom_left if side == "left" else bottom_right
 
-        left_to_right = (armpit_right - armpit_left).normalized()
-        right_to_left = (armpit_left - armpit_right).normalized()
+        left_to_right = normalize(armpit_right - armpit_left)
+        right_to_left = normalize(armpit_left - armpit_right)
 
         gripper_translation = armpit if gripper_positioning == "top" else bottom
 
@@ -153,7 +220,7 @@ class SideFold(Fold):
         Z /= np.linalg.norm(Z)
         Y = np.cross(Z, X)
 
-        start_pose = abt.Frame.from_vectors(X, Y, Z, gripper_translation)
+        start_pose = Frame.from_vectors(X, Y, Z, gripper_translation)
 
         return start_pose
 
@@ -163,6 +230,7 @@ class MiddleFold(Fold):
         self.side = side
         super().__init__(keypoints)
 
+    @cached_geometry
     def fold_line(self):
         keypoints = self.keypoints
 
@@ -174,7 +242,7 @@ class MiddleFold(Fold):
         middle_left = 0.5 * shoulder_left + 0.5 * bottom_left
         middle_right = 0.5 * shoulder_right + 0.5 * bottom_right
 
-        right_to_left = (middle_left - middle_right).normalized()
+        right_to_left = normalize(middle_left - middle_right)
 
         line_direction = right_to_left
         line_direction /= np.linalg.norm(line_direction)
@@ -183,6 +251,7 @@ class MiddleFold(Fold):
 
         return point_on_line, line_direction
 
+    @cached_geometry
     def gripper_start_pose(self):
         keypoints = self.keypoints
         side = self.side
@@ -195,64 +264,239 @@ class MiddleFold(Fold):
 
         if side == "left":
             gripper_translation = 0.75 * bottom_left + 0.25 * bottom_right
-            bottom_to_top = (armpit_left - bottom_left).normalized()
+            bottom_to_top = normalize(armpit_left - bottom_left)
         else:
             gripper_translation = 0.25 * bottom_left + 0.75 * bottom_right
-            bottom_to_top = (armpit_right - bottom_right).normalized()
+            bottom_to_top = normalize(armpit_right - bottom_right)
 
         up = np.array([0, 0, 1])
         X = up
         Z = bottom_to_top
         Y = np.cross(Z, X)
 
-        start_pose = abt.Frame.from_vectors(X, Y, Z, gripper_translation)
+        start_pose = Frame.from_vectors(X, Y, Z, gripper_translation)
 
         return start_pose
 
 
-class EllipticalFoldTrajectory(Trajectory):
+class FoldSequence:
+    """A sequence of folds applied one after another, e.g. to create the target of a multi-step folding task.
+
+    Each step is a (fold, cloth_thickness) pair. The folds are applied to a single vertex array. Mirroring only
+    moves vertices horizontally, so each vertex carries the sum of the thicknesses of the folds it was part of as
+    its layer offset, which is added to its height once at the end.
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+
+    def fold_vertices(self, vertices, out=None, return_layer_offsets=False):
+        """Apply all folds to an (N, 3) array of vertex positions.
+
+        Args:
+            vertices (np.ndarray): (N, 3) array of vertex positions.
+            out (np.ndarray): optional (N, 3) output array, pass vertices itself to fold in place.
+            return_layer_offsets (bool): also return the (N,) array of accumulated height offsets.
+        """
+        positions = np.array(vertices) if out is None else out
+        if out is not None and out is not vertices:
+            out[...] = vertices
+
+        layer_offsets = np.zeros(len(positions), dtype=positions.dtype)
+        for fold, cloth_thickness in self.steps:
+            frame = fold_frame(*fold.fold_line())
+            _, folded = reflect_vertices(positions, frame, out=positions)
+            layer_offsets[folded] += cloth_thickness
+
+        positions[:, 2] += layer_offsets
+
+        if return_layer_offsets:
+            return positions, layer_offsets
+        return positions
+
+    def make_target_mesh(self, cloth):
+        """Create a single copy of the cloth with all folds applied, without intermediate meshes."""
+        cloth_folded = copy_target_object(cloth)
+        vertices = get_vertex_coordinates(cloth_folded.data)
+        self.fold_vertices(vertices, out=vertices)
+        set_vertex_coordinates(cloth_folded.data, vertices)
+        return cloth_folded
+
+
+class ArrayPath:
+    """A path with the pose(s) method of the airo_blender_toolkit paths, e.g. for abt.visualize_path.
+
+    Args:
+        poses (callable): maps an array of path parameters to (T, 3) positions and (T, 3, 3) orientations.
+    """
+
+    def __init__(self, poses):
+        self.poses = poses
+
+    def pose(self, s):
+        positions, orientations = self.poses(np.atleast_1d(s))
+        return Frame.from_orientation_and_position(orientations[0], positions[0])
+
+
+class FoldTrajectory(ABC):
+    """A gripper trajectory over times in [0, 1], evaluated with NumPy only.
+
+    Subclasses implement poses(ts). The path attribute builds a path with the same shape on first access, e.g. for
+    abt.visualize_path, so Blender is only needed to visualize a trajectory.
+    """
+
+    @abstractmethod
+    def poses(self, ts):
+        """(T, 3) positions and (T, 3, 3) orientations at an array of times."""
+
+    @abstractmethod
+    def make_path(self):
+        """A path with the pose(s) method of the airo_blender_toolkit paths and the same shape as this trajectory."""
+
+    def positions(self, ts):
+        return self.poses(ts)[0]
+
+    def transforms(self, ts):
+        """(T, 4, 4) homogeneous gripper poses at an array of times."""
+        return pose_matrices(*self.poses(ts))
+
+    def pose(self, t):
+        """The pose at time t as a 4x4 Frame."""
+        positions, orientations = self.poses(t)
+        return Frame.from_orientation_and_position(orientations[0], positions[0])
+
+    @property
+    def start(self):
+        return self.pose(0.0)
+
+    @property
+    def end(self):
+        return self.pose(1.0)
+
+    @functools.cached_property
+    def path(self):
+        return self.make_path()
+
+
+class EllipticalFoldTrajectory(FoldTrajectory):
     def __init__(self, fold, end_angle=170, scale=1.0, tilt_angle=0, orientation_mode="rotated"):
-        path = TiltedEllipticalArcPath(
-            fold.gripper_start_pose(),
-            *fold.fold_line(),
-            end_angle=end_angle,
-            scale=scale,
-            tilt_angle=tilt_angle,
-            orientation_mode=orientation_mode,
+        self.start_pose = np.array(fold.gripper_start_pose())
+        self.line = fold.fold_line()
+        self.end_angle = end_angle
+        self.scale = scale
+        self.tilt_angle = tilt_angle
+        self.orientation_mode = orientation_mode
+
+    def arc_poses(self, s):
+        """(T, 3) positions and (T, 3, 3) orientations at an array of arc parameters, see paths.elliptical_arc."""
+        return elliptical_arc(self.start_pose, *self.line, self.end_angle, self.scale, self.tilt_angle, s)
+
+    def make_path(self):
+        # The NumPy arc only implements the rotated orientation, the other modes are evaluated by the abt path.
+        if self.orientation_mode == "rotated":
+            return ArrayPath(self.arc_poses)
+
+        from airo_blender_toolkit.path import TiltedEllipticalArcPath
+
+        return TiltedEllipticalArcPath(
+            Frame(self.start_pose),
+            *self.line,
+            end_angle=self.end_angle,
+            scale=self.scale,
+            tilt_angle=self.tilt_angle,
+            orientation_mode=self.orientation_mode,
         )
-        super().__init__(path, MinimumJerk())
+
+    def poses(self, ts):
+        """Sample the trajectory at an array of times in [0, 1].
+
+        Returns:
+            tuple: (T, 3) positions and (T, 3, 3) orientations.
+        """
+        s = minimum_jerk(np.atleast_1d(ts))
+        if self.orientation_mode == "rotated":
+            return self.arc_poses(s)
+
+        frames = np.array([np.array(self.path.pose(s_i)) for s_i in s])
+        return frames[:, :3, 3], frames[:, :3, :3]
 
 
-class BezierFoldTrajectory(Trajectory):
+class BezierFoldTrajectory(FoldTrajectory):
     def __init__(self, fold, height_ratio=1.0, tilt_angle=0, end_height=0.05, end_angle=170):
         start_pose = fold.gripper_start_pose()
+        fold_line = fold.fold_line()
 
         # Mimic end pose of circular arc
-        ciruclar_trajectory = EllipticalFoldTrajectory(fold, end_angle=end_angle)
-        end_pose = ciruclar_trajectory.path.end
+        end_pose = np.array(fold.gripper_end_pose(end_angle))
         if end_height is not None:
-            end_pose.position[2] = end_height
+            end_pose[2, 3] = end_height
 
-        start_position = start_pose.position
-        end_position = end_pose.position
+        control_points = bezier_fold_control_points(
+            np.array(start_pose)[:3, 3], end_pose[:3, 3], *fold_line, height_ratio, tilt_angle
+        )
+        self.control_points = control_points[0]
+        self.start_orientation = np.array(start_pose)[:3, :3]
+        self.end_orientation = end_pose[:3, :3]
+
+    def make_path(self):
+        from airo_blender_toolkit.path import BezierPath
+
+        # TODO: consider allowing control points to be full poses and interpolation orienation
+        return BezierPath(list(self.control_points), self.start_orientation, self.end_orientation)
+
+    def poses(self, ts):
+        """Sample the trajectory at an array of times in [0, 1] with a single evaluation of the curve.
+
+        Returns:
+            tuple: (T, 3) positions on the Bezier curve and (T, 3, 3) orientations, slerped from start to end.
+        """
+        s = minimum_jerk(np.atleast_1d(ts))
+        return quadratic_bezier(self.control_points, s), slerp(self.start_orientation, self.end_orientation, s)
+
+    def positions(self, ts):
+        return quadratic_bezier(self.control_points, minimum_jerk(np.atleast_1d(ts)))
 
-        mid_position = abt.project_point_on_line(start_position, *fold.fold_line())
-        start_to_mid = start_position - mid_position
-        start_to_fold_line_distance = np.linalg.norm(start_to_mid)
 
-        # Note that we do not halve this distance, because the curve will lie
-        # halfway between the control point and the ground
-        raised_mid_position = mid_position.copy()
-        raised_mid_position[2] += height_ratio * start_to_fold_line_distance * 2
+class BezierFoldTrajectoryBatch:
+    """The Bezier fold trajectories of one fold for a whole grid of parameters, as arrays.
 
-        start_to_end = end_position - start_position
+    The start pose, fold line and end pose are computed once for the fold. The trajectories only differ in their
+    control points, which are stored as a single (G, 3, 3) array.
 
-        tilted_mid_position = abt.rotate_point(
-            raised_mid_position, start_position, start_to_end, np.deg2rad(tilt_angle)
+    Args:
+        fold (Fold): the fold all trajectories perform.
+        height_ratios (np.ndarray): (G,) height ratios, see BezierFoldTrajectory.
+        tilt_angles (np.ndarray): (G,) tilt angles in degrees.
+        end_heights (np.ndarray): (G,) heights of the end positions, or None to end on the circular arc.
+        end_angle (float): angle of the circular arc whose end pose the trajectories mimic.
+    """
+
+    def __init__(self, fold, height_ratios, tilt_angles, end_heights=0.05, end_angle=170):
+        start_pose = np.array(fold.gripper_start_pose())
+        fold_line = fold.fold_line()
+        end_pose = fold.gripper_end_pose(end_angle)
+
+        height_ratios = np.atleast_1d(np.asarray(height_ratios, dtype=np.float64))
+        end_positions = np.repeat(end_pose[np.newaxis, :3, 3], len(height_ratios), axis=0)
+        if end_heights is not None:
+            end_positions[:, 2] = end_heights
+
+        self.height_ratios = height_ratios
+        self.tilt_angles = np.broadcast_to(np.asarray(tilt_angles, dtype=np.float64), height_ratios.shape)
+        self.control_points = bezier_fold_control_points(
+            start_pose[:3, 3], end_positions, *fold_line, height_ratios, self.tilt_angles
         )
+        self.start_orientation = start_pose[:3, :3]
+        self.end_orientation = end_pose[:3, :3]
 
-        control_points = [start_position, tilted_mid_position, end_position]
+    def __len__(self):
+        return len(self.control_points)
 
-        # TODO: consider allowing control points to be full poses and interpolation orienation
-        path = BezierPath(control_points, start_pose.orientation, end_pose.orientation)
-        super().__init__(path, MinimumJerk())
+    def positions(self, ts):
+        """The (G, T) grid of positions of all trajectories at an array of times, as a (G, T, 3) array."""
+        return quadratic_bezier(self.control_points, minimum_jerk(np.atleast_1d(ts)))
+
+    def poses(self, ts):
+        """(G, T, 3) positions and the (T, 3, 3) orientations, which are the same for all trajectories."""
+        s = minimum_jerk(np.atleast_1d(ts))
+        return quadratic_bezier(self.control_points, s), slerp(self.start_orientation, self.end_orientation, s)
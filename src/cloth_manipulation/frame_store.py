@@ -0,0 +1,192 @@
+"""Compact binary store of simulated cloth trajectories."""
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+FORMAT_VERSION = 1
+
+
+class FrameStoreWriter:
+    """Append frames to a new frame store.
+
+    A store is a directory with a header.json, the (F, 3) triangles.npy and either a (T, N, 3) float32 positions.npy
+    that can be memory mapped, optionally with velocities.npy, or compressed chunks of chunk_size frames.
+
+    Args:
+        path (str): directory of the store, created if it does not exist.
+        triangles (np.ndarray): (F, 3) vertex indices of the cloth.
+        n_vertices (int): number of vertices per frame.
+        max_frames (int): capacity of the uncompressed positions array, unused when compressing.
+        velocities (bool): also store a velocity for every vertex of every frame.
+        compress (bool): store the frames in compressed chunks instead of one memory mappable array.
+        chunk_size (int): frames per compressed chunk.
+        metadata (dict): JSON serializable information about the trajectory, e.g. the frame rate.
+    """
+
+    def __init__(
+        self,
+        path,
+        triangles,
+        n_vertices,
+        max_frames=None,
+        velocities=False,
+        compress=False,
+        chunk_size=32,
+        metadata=None,
+    ):
+        if not compress and max_frames is None:
+            raise ValueError("max_frames is required to preallocate an uncompressed frame store.")
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "triangles.npy"), np.asarray(triangles, dtype=np.int32))
+
+        self.path = path
+        self.n_vertices = n_vertices
+        self.has_velocities = velocities
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.metadata = {} if metadata is None else metadata
+        self.n_frames = 0
+
+        self.velocities = None
+        if compress:
+            # Buffer for the chunk that is being filled.
+            shape = (chunk_size, n_vertices, 3)
+            self.positions = np.empty(shape, dtype=np.float32)
+            if velocities:
+                self.velocities = np.empty(shape, dtype=np.float32)
+        else:
+            shape = (max_frames, n_vertices, 3)
+            self.positions = open_memmap(os.path.join(path, "positions.npy"), "w+", np.float32, shape)
+            if velocities:
+                self.velocities = open_memmap(os.path.join(path, "velocities.npy"), "w+", np.float32, shape)
+
+    def append(self, positions, velocities=None):
+        """Add the (N, 3) positions, and velocities if the store has them, of the next frame."""
+        if self.has_velocities and velocities is None:
+            raise ValueError("This frame store expects velocities for every frame.")
+
+        index = self.n_frames % self.chunk_size if self.compress else self.n_frames
+        if index >= len(self.positions):
+            raise ValueError(f"The frame store is full, it was created for {len(self.positions)} frames.")
+
+        self.positions[index] = positions
+        if self.has_velocities:
+            self.velocities[index] = velocities
+        self.n_frames += 1
+
+        if self.compress and index == self.chunk_size - 1:
+            self._flush_chunk(self.chunk_size)
+
+    def _flush_chunk(self, n_frames_in_chunk):
+        chunk = (self.n_frames - 1) // self.chunk_size
+        arrays = {"positions": self.positions[:n_frames_in_chunk]}
+        if self.has_velocities:
+            arrays["velocities"] = self.velocities[:n_frames_in_chunk]
+        np.savez_compressed(os.path.join(self.path, f"chunk_{chunk:05d}.npz"), **arrays)
+
+    def close(self):
+        """Write the remaining frames and the header. The store can only be read after it is closed."""
+        if self.compress:
+            n_frames_in_chunk = self.n_frames % self.chunk_size
+            if n_frames_in_chunk > 0:
+                self._flush_chunk(n_frames_in_chunk)
+        else:
+            self.positions.flush()
+            if self.has_velocities:
+                self.velocities.flush()
+
+        header = {
+            "version": FORMAT_VERSION,
+            "n_frames": self.n_frames,
+            "n_vertices": self.n_vertices,
+            "velocities": self.has_velocities,
+            "compressed": self.compress,
+            "chunk_size": self.chunk_size,
+            "metadata": self.metadata,
+        }
+        with open(os.path.join(self.path, "header.json"), "w") as f:
+            json.dump(header, f, indent=4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Without a header the store cannot be opened, so frames of a write that failed are never read as complete.
+        if exc_type is None:
+            self.close()
+
+
+class FrameStore:
+    """Read frames from a frame store, see FrameStoreWriter.
+
+    Indexing returns the (N, 3) positions of a frame, e.g. store[-1] is the final state of the cloth. Uncompressed
+    stores are memory mapped, so only the frames that are accessed are read from disk.
+
+    Args:
+        path (str): directory of the store.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "header.json")) as f:
+            self.header = json.load(f)
+        if self.header["version"] > FORMAT_VERSION:
+            raise ValueError(f"Frame store {path} has version {self.header['version']}, expected {FORMAT_VERSION}.")
+
+        self.path = path
+        self.n_frames = self.header["n_frames"]
+        self.n_vertices = self.header["n_vertices"]
+        self.has_velocities = self.header["velocities"]
+        self.metadata = self.header["metadata"]
+        self.triangles = np.load(os.path.join(path, "triangles.npy"))
+
+        self._chunk_index = None
+        self._chunk = None
+        if not self.header["compressed"]:
+            self._positions = np.load(os.path.join(path, "positions.npy"), mmap_mode="r")[: self.n_frames]
+            if self.has_velocities:
+                self._velocities = np.load(os.path.join(path, "velocities.npy"), mmap_mode="r")[: self.n_frames]
+
+    def __len__(self):
+        return self.n_frames
+
+    def __getitem__(self, frame):
+        return self.positions(frame)
+
+    def _frame_index(self, frame):
+        if frame < 0:
+            frame += self.n_frames
+        if not 0 <= frame < self.n_frames:
+            raise IndexError(f"Frame {frame} is out of range for a frame store with {self.n_frames} frames.")
+        return frame
+
+    def _load(self, channel, frame):
+        frame = self._frame_index(frame)
+        if not self.header["compressed"]:
+            return self._positions[frame] if channel == "positions" else self._velocities[frame]
+
+        chunk_size = self.header["chunk_size"]
+        chunk_index = frame // chunk_size
+        if chunk_index != self._chunk_index:
+            with np.load(os.path.join(self.path, f"chunk_{chunk_index:05d}.npz")) as chunk:
+                self._chunk = {name: chunk[name] for name in chunk.files}
+            self._chunk_index = chunk_index
+        return self._chunk[channel][frame % chunk_size]
+
+    def positions(self, frame):
+        """The (N, 3) vertex positions of a frame."""
+        return self._load("positions", frame)
+
+    def velocities(self, frame):
+        """The (N, 3) vertex velocities of a frame, if the store has them."""
+        if not self.has_velocities:
+            raise ValueError(f"Frame store {self.path} has no velocities.")
+        return self._load("velocities", frame)
+
+    def all_positions(self):
+        """The full (T, N, 3) positions array, memory mapped if the store is not compressed."""
+        if not self.header["compressed"]:
+            return self._positions
+        return np.stack([self.positions(frame) for frame in range(self.n_frames)])
@@ -0,0 +1,208 @@
+import numpy as np
+
+
+class Frame(np.ndarray):
+    """A 4x4 homogeneous pose as a NumPy array, with the same position and orientation views as abt.Frame."""
+
+    def __new__(cls, matrix=None):
+        matrix = np.identity(4) if matrix is None else matrix
+        return np.array(matrix, dtype=np.float64).view(cls)
+
+    @classmethod
+    def from_vectors(cls, X, Y, Z, translation):
+        frame = cls()
+        frame.orientation[:, 0] = X
+        frame.orientation[:, 1] = Y
+        frame.orientation[:, 2] = Z
+        frame.position[:] = translation
+        return frame
+
+    @classmethod
+    def from_orientation_and_position(cls, orientation, position):
+        frame = cls()
+        frame.orientation[:] = orientation
+        frame.position[:] = position
+        return frame
+
+    @property
+    def position(self):
+        return self.view(np.ndarray)[:3, 3]
+
+    @property
+    def orientation(self):
+        return self.view(np.ndarray)[:3, :3]
+
+
+def pose_matrices(positions, orientations):
+    """(..., 4, 4) homogeneous matrices of (..., 3) positions and (..., 3, 3) orientations."""
+    orientations = np.asarray(orientations, dtype=np.float64)
+    matrices = np.zeros(orientations.shape[:-2] + (4, 4))
+    matrices[..., :3, :3] = orientations
+    matrices[..., :3, 3] = positions
+    matrices[..., 3, 3] = 1.0
+    return matrices
+
+
+def normalize(vector):
+    """The vector divided by its length."""
+    vector = np.asarray(vector, dtype=np.float64)
+    return vector / np.linalg.norm(vector)
+
+
+def fold_frame(point_on_line, line_direction):
+    """Homogeneous 4x4 matrix of the frame in which a fold is a reflection of the y-axis.
+
+    The X-axis is the fold line direction, Z is up and Y = Z x X points to the side that gets folded over.
+    """
+    X = np.asarray(line_direction, dtype=np.float64)
+    Z = np.array([0.0, 0.0, 1.0])
+    Y = np.cross(Z, X)
+
+    frame = np.identity(4)
+    frame[:3, 0] = X
+    frame[:3, 1] = Y
+    frame[:3, 2] = Z
+    frame[:3, 3] = point_on_line
+    return frame
+
+
+def reflect_vertices(vertices, frame, out=None):
+    """Mirror the vertices on the positive y side of a fold frame across its XZ-plane.
+
+    Because the frame's Y-axis is horizontal, this is a single projection of all vertices onto Y followed by a
+    masked update, instead of a change of basis per vertex.
+
+    Args:
+        vertices (np.ndarray): (N, 3) array of vertex positions.
+        frame (np.ndarray): 4x4 fold frame, see fold_frame.
+        out (np.ndarray): optional (N, 3) output array, pass vertices itself to reflect in place.
+
+    Returns:
+        tuple: the (N, 3) array of reflected positions and the (N,) boolean mask of the reflected vertices.
+    """
+    vertices = np.asarray(vertices)
+    if out is None:
+        out = vertices.copy()
+    elif out is not vertices:
+        out[...] = vertices
+
+    frame_inv = np.linalg.inv(frame)
+    y = vertices @ frame_inv[1, :3] + frame_inv[1, 3]
+    reflected = y >= 0.0
+
+    # Mirroring y in the fold frame is a translation along Y in world space.
+    out[reflected] -= np.multiply.outer(2.0 * y[reflected], frame[:3, 1])
+    return out, reflected
+
+
+def fold_vertices(vertices, point_on_line, line_direction, cloth_thickness=0.001, out=None):
+    """Fold the vertices that lie on the positive side of the fold line over that line.
+
+    Vertices with a non-negative y-coordinate in the fold frame are mirrored and lifted by cloth_thickness.
+
+    Args:
+        vertices (np.ndarray): (N, 3) array of vertex positions.
+        point_on_line: a point on the fold line.
+        line_direction: direction of the fold line.
+        cloth_thickness (float): height added to the folded vertices so they lie on top of the cloth.
+        out (np.ndarray): optional (N, 3) output array, pass vertices itself to fold in place.
+
+    Returns:
+        np.ndarray: the (N, 3) array of folded vertex positions.
+    """
+    frame = fold_frame(point_on_line, line_direction)
+    out, folded = reflect_vertices(vertices, frame, out)
+    out[folded] += cloth_thickness * frame[:3, 2]
+    return out
+
+
+def rotation_matrices(axis, angles):
+    """Rotation matrices about unit axes for an array of angles, with Rodrigues' formula.
+
+    Args:
+        axis (np.ndarray): unit vector of the rotation axis, or a (*S, 3) array of axes, one per angle.
+        angles (np.ndarray): angles in radians, of any shape S.
+
+    Returns:
+        np.ndarray: (*S, 3, 3) array of rotation matrices.
+    """
+    axis = np.asarray(axis, dtype=np.float64)
+    zeros = np.zeros(axis.shape[:-1])
+    x, y, z = np.moveaxis(axis, -1, 0)
+    K = np.stack([zeros, -z, y, z, zeros, -x, -y, x, zeros], axis=-1).reshape(axis.shape[:-1] + (3, 3))
+    angles = np.asarray(angles, dtype=np.float64)[..., np.newaxis, np.newaxis]
+    return np.identity(3) + np.sin(angles) * K + (1.0 - np.cos(angles)) * (K @ K)
+
+
+def rotate_point(point, point_on_axis, axis, angle):
+    """Rotate a point about the line through point_on_axis with the given unit direction."""
+    return rotation_matrices(axis, angle) @ (np.asarray(point) - point_on_axis) + point_on_axis
+
+
+def project_point_on_line(point, point_on_line, line_direction):
+    """Orthogonal projection of a point on the line through point_on_line with the given unit direction."""
+    point_on_line = np.asarray(point_on_line, dtype=np.float64)
+    return point_on_line + np.dot(np.asarray(point) - point_on_line, line_direction) * np.asarray(line_direction)
+
+
+def quaternion_from_matrix(matrix):
+    """Unit quaternion (w, x, y, z) of a 3x3 rotation matrix."""
+    m = np.asarray(matrix, dtype=np.float64)
+    trace = np.trace(m)
+    if trace > 0.0:
+        s = 2.0 * np.sqrt(trace + 1.0)
+        q = [0.25 * s, (m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s]
+    elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+        s = 2.0 * np.sqrt(1.0 + m[0, 0] - m[1, 1] - m[2, 2])
+        q = [(m[2, 1] - m[1, 2]) / s, 0.25 * s, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s]
+    elif m[1, 1] > m[2, 2]:
+        s = 2.0 * np.sqrt(1.0 + m[1, 1] - m[0, 0] - m[2, 2])
+        q = [(m[0, 2] - m[2, 0]) / s, (m[0, 1] + m[1, 0]) / s, 0.25 * s, (m[1, 2] + m[2, 1]) / s]
+    else:
+        s = 2.0 * np.sqrt(1.0 + m[2, 2] - m[0, 0] - m[1, 1])
+        q = [(m[1, 0] - m[0, 1]) / s, (m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, 0.25 * s]
+    q = np.array(q)
+    return q / np.linalg.norm(q)
+
+
+def matrices_from_quaternions(quaternions):
+    """(..., 3, 3) rotation matrices of an (..., 4) array of unit quaternions (w, x, y, z)."""
+    w, x, y, z = np.moveaxis(np.asarray(quaternions), -1, 0)
+    matrices = np.empty(w.shape + (3, 3))
+    matrices[..., 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrices[..., 0, 1] = 2.0 * (x * y - z * w)
+    matrices[..., 0, 2] = 2.0 * (x * z + y * w)
+    matrices[..., 1, 0] = 2.0 * (x * y + z * w)
+    matrices[..., 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrices[..., 1, 2] = 2.0 * (y * z - x * w)
+    matrices[..., 2, 0] = 2.0 * (x * z - y * w)
+    matrices[..., 2, 1] = 2.0 * (y * z + x * w)
+    matrices[..., 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return matrices
+
+
+def slerp(start_orientation, end_orientation, s):
+    """Spherical linear interpolation between two 3x3 orientations.
+
+    Args:
+        start_orientation: 3x3 rotation matrix at s = 0.
+        end_orientation: 3x3 rotation matrix at s = 1.
+        s (np.ndarray): interpolation parameters of any shape S.
+
+    Returns:
+        np.ndarray: (*S, 3, 3) array of rotation matrices.
+    """
+    q0 = quaternion_from_matrix(start_orientation)
+    q1 = quaternion_from_matrix(end_orientation)
+    cos_angle = np.dot(q0, q1)
+    if cos_angle < 0.0:  # Take the shortest way around.
+        q1, cos_angle = -q1, -cos_angle
+
+    s = np.asarray(s, dtype=np.float64)[..., np.newaxis]
+    angle = np.arccos(min(cos_angle, 1.0))
+    if angle < 1e-8:
+        quaternions = (1.0 - s) * q0 + s * q1
+    else:
+        quaternions = (np.sin((1.0 - s) * angle) * q0 + np.sin(s * angle) * q1) / np.sin(angle)
+    quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    return matrices_from_quaternions(quaternions)
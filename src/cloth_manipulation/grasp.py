@@ -0,0 +1,208 @@
+"""Detection and rigid motion of the cloth vertices that a gripper grasps."""
+import numpy as np
+
+from cloth_manipulation.geometry import pose_matrices, quaternion_from_matrix, rotation_matrices
+from cloth_manipulation.mesh import get_world_vertex_coordinates
+
+
+def face_bounding_boxes(vertices, faces):
+    """The (F, 3) minimum and (F, 3) maximum corners of the AABBs of all faces, from one (F, K, 3) gather."""
+    face_vertices = np.asarray(vertices)[faces]
+    return face_vertices.min(axis=1), face_vertices.max(axis=1)
+
+
+def get_polygons(mesh):
+    """Read the vertex indices of all polygons of a Blender mesh as one (F, K) array, K the largest polygon size.
+
+    Smaller polygons are padded by repeating their last vertex, which changes neither their AABB nor their vertex set.
+    """
+    n_polygons = len(mesh.polygons)
+    loop_starts = np.empty(n_polygons, dtype=np.int32)
+    loop_totals = np.empty(n_polygons, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+
+    corners = np.minimum(np.arange(loop_totals.max(initial=3)), loop_totals[:, np.newaxis] - 1)
+    return loop_vertices[loop_starts[:, np.newaxis] + corners]
+
+
+def boxes_overlap(mins_a, maxs_a, mins_b, maxs_b):
+    """Whether AABBs overlap, touching boxes count as overlapping. The arguments are broadcast against each other."""
+    return np.all((mins_a <= maxs_b) & (mins_b <= maxs_a), axis=-1)
+
+
+class GraspIndex:
+    """The face AABBs of a cloth at one moment, to find the vertices of the faces that overlap gripper boxes.
+
+    Without a cell size, every query tests all faces at once. With a cell size, the faces are also sorted into a
+    uniform grid by the cell of their minimum corner, so a query only tests the faces in the cells near its box.
+    This pays off for large meshes and small grippers.
+
+    Args:
+        vertices (np.ndarray): (N, 3) world-space vertex positions.
+        faces (np.ndarray): (F, K) vertex indices, e.g. triangles or the padded polygons of get_polygons.
+        cell_size (float): edge length of the grid cells, or None to not build a grid.
+    """
+
+    def __init__(self, vertices, faces, cell_size=None):
+        self.faces = np.asarray(faces)
+        self.mins, self.maxs = face_bounding_boxes(vertices, self.faces)
+        self.cell_size = cell_size
+
+        if cell_size is not None:
+            self.max_extent = (self.maxs - self.mins).max(axis=0)
+            self.origin = self.mins.min(axis=0)
+            cells = self._cells(self.mins)
+            self.shape = cells.max(axis=0) + 1
+            keys = np.ravel_multi_index(cells.T, self.shape)
+            self.order = np.argsort(keys, kind="stable")
+            self.sorted_keys = keys[self.order]
+
+    @classmethod
+    def from_object(cls, obj, cell_size=None):
+        """Index the polygons of a Blender object in world space."""
+        return cls(get_world_vertex_coordinates(obj), get_polygons(obj.data), cell_size)
+
+    def _cells(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def _candidate_faces(self, box_min, box_max):
+        if self.cell_size is None:
+            return np.arange(len(self.mins))
+
+        # A face can only overlap the box if its minimum corner lies within max_extent below the box.
+        low = np.clip(self._cells(box_min - self.max_extent), 0, self.shape - 1)
+        high = self._cells(box_max)
+        if np.any(high < 0):
+            return np.empty(0, dtype=np.int64)
+        high = np.minimum(high, self.shape - 1)
+
+        ranges = [np.arange(start, stop + 1) for start, stop in zip(low, high)]
+        cells = np.stack(np.meshgrid(*ranges, indexing="ij"), axis=-1).reshape(-1, 3)
+        keys = np.ravel_multi_index(cells.T, self.shape)
+        starts = np.searchsorted(self.sorted_keys, keys, side="left")
+        ends = np.searchsorted(self.sorted_keys, keys, side="right")
+        return np.concatenate([self.order[start:end] for start, end in zip(starts, ends)])
+
+    def grasped_faces(self, box_min, box_max):
+        """Indices of the faces whose AABB overlaps the box."""
+        faces = self._candidate_faces(np.asarray(box_min), np.asarray(box_max))
+        overlapping = boxes_overlap(self.mins[faces], self.maxs[faces], box_min, box_max)
+        return faces[overlapping]
+
+    def grasped_vertices(self, box_min, box_max):
+        """Sorted indices of the vertices of the faces whose AABB overlaps the box."""
+        return np.unique(self.faces[self.grasped_faces(box_min, box_max)])
+
+    def grasped_vertices_batch(self, box_mins, box_maxs):
+        """The grasped vertices of G boxes, given as (G, 3) arrays, tested against all faces in one (G, F) pass."""
+        if self.cell_size is not None:
+            return [self.grasped_vertices(box_min, box_max) for box_min, box_max in zip(box_mins, box_maxs)]
+
+        overlapping = boxes_overlap(
+            self.mins[np.newaxis], self.maxs[np.newaxis], box_mins[:, np.newaxis], box_maxs[:, np.newaxis]
+        )
+        return [np.unique(self.faces[faces]) for faces in overlapping]
+
+
+def object_bounding_box(obj):
+    """The minimum and maximum corner of the world-space AABB of a Blender object."""
+    vertices = get_world_vertex_coordinates(obj)
+    return vertices.min(axis=0), vertices.max(axis=0)
+
+
+def find_grasped_vertices(obj, gripper, index=None):
+    """The set of vertex ids of obj that gripper grasps.
+
+    Pass the GraspIndex of obj for the current frame to share the face AABBs between grippers.
+    """
+    if index is None:
+        index = GraspIndex.from_object(obj)
+    return set(index.grasped_vertices(*object_bounding_box(gripper)).tolist())
+
+
+def transform_points(transforms, points):
+    """Apply (..., 4, 4) homogeneous transforms to (G, 3) points in one batched product, giving (..., G, 3)."""
+    points = np.asarray(points, dtype=np.float64)
+    homogeneous = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+    return np.einsum("...ij,gj->...gi", np.asarray(transforms)[..., :3, :], homogeneous)
+
+
+def grasped_vertex_trajectories(vertices, transforms, grasp_transform=None):
+    """The positions of grasped vertices that move rigidly with a gripper.
+
+    Args:
+        vertices (np.ndarray): (G, 3) world-space positions of the grasped vertices when the gripper closes.
+        transforms (np.ndarray): (T, 4, 4) gripper poses, e.g. from FoldTrajectory.transforms.
+        grasp_transform (np.ndarray): 4x4 gripper pose when it closes, the first of transforms by default.
+
+    Returns:
+        np.ndarray: (T, G, 3) vertex positions.
+    """
+    if grasp_transform is None:
+        grasp_transform = transforms[0]
+    local_vertices = transform_points(np.linalg.inv(grasp_transform), vertices)
+    return transform_points(transforms, local_vertices)
+
+
+def finite_difference_velocities(positions, times):
+    """The (T - 1, G, 3) velocities between consecutive rows of (T, G, 3) positions sampled at (T,) times."""
+    return np.diff(positions, axis=0) / np.diff(times)[:, np.newaxis, np.newaxis]
+
+
+def keyframed_transforms(obj, frames):
+    """Evaluate the (T, 4, 4) world matrices of an object at frames from its fcurves, without scene.frame_set.
+
+    Only location, XYZ Euler rotation and scale channels are supported, and the object must not have a parent.
+    """
+    if obj.parent is not None or obj.rotation_mode != "XYZ":
+        raise ValueError(f"{obj.name} needs XYZ Euler rotation and no parent to evaluate its fcurves directly.")
+
+    frames = np.asarray(frames, dtype=np.float64)
+    channels = {
+        "location": np.tile(np.array(obj.location, dtype=np.float64), (len(frames), 1)),
+        "rotation_euler": np.tile(np.array(obj.rotation_euler, dtype=np.float64), (len(frames), 1)),
+        "scale": np.tile(np.array(obj.scale, dtype=np.float64), (len(frames), 1)),
+    }
+    if obj.animation_data is not None and obj.animation_data.action is not None:
+        for fcurve in obj.animation_data.action.fcurves:
+            if fcurve.data_path not in channels:
+                raise ValueError(f"Animated channel {fcurve.data_path} of {obj.name} is not supported.")
+            channels[fcurve.data_path][:, fcurve.array_index] = [fcurve.evaluate(frame) for frame in frames]
+
+    x, y, z = channels["rotation_euler"].T
+    axes = np.identity(3)
+    rotations = rotation_matrices(axes[2], z) @ rotation_matrices(axes[1], y) @ rotation_matrices(axes[0], x)
+    orientations = rotations * channels["scale"][:, np.newaxis, :]
+    return pose_matrices(channels["location"], orientations)
+
+
+def rigid_velocities(vertices, transform, next_transform, dt):
+    """The (G, 3) velocities that move vertices rigidly with a gripper from one pose to the next in dt seconds."""
+    motion = np.asarray(next_transform) @ np.linalg.inv(transform)
+    return (transform_points(motion, vertices) - vertices) / dt
+
+
+def rigid_motion(transform, next_transform, dt):
+    """Split the motion of a gripper from one pose to the next in dt seconds into a translation and a rotation.
+
+    A point x moves to center + R (x - center) + velocity * dt, with R the rotation of angular_velocity * dt about
+    the axis. The transforms must not scale.
+
+    Returns:
+        tuple: the (3,) linear velocity of the gripper, the (3,) rotation center, which is the gripper position at
+            the start, the (3,) unit rotation axis and the angular velocity in radians per second.
+    """
+    transform = np.asarray(transform, dtype=np.float64)
+    next_transform = np.asarray(next_transform, dtype=np.float64)
+    center = transform[:3, 3]
+    velocity = (next_transform[:3, 3] - center) / dt
+
+    quaternion = quaternion_from_matrix(next_transform[:3, :3] @ transform[:3, :3].T)
+    w, *xyz = quaternion if quaternion[0] >= 0.0 else -quaternion  # Rotate the short way, by at most pi.
+    sin_half_angle = np.linalg.norm(xyz)
+    if sin_half_angle == 0.0:
+        return velocity, center, np.array([0.0, 0.0, 1.0]), 0.0
+    return velocity, center, np.array(xyz) / sin_half_angle, 2.0 * np.arctan2(sin_half_angle, w) / dt
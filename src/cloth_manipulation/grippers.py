@@ -0,0 +1,152 @@
+"""Grippers that follow a fold trajectory and compute their actions without evaluating the Blender scene."""
+import numpy as np
+
+from cloth_manipulation.grasp import GraspIndex, get_polygons, rigid_motion, rigid_velocities, transform_points
+from cloth_manipulation.mesh import get_world_vertex_coordinates
+
+CUBE_CORNERS = np.array([[x, y, z] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+
+
+def no_action():
+    """The vertex ids and (G, 3) velocities of an action that controls no vertices."""
+    return np.empty(0, dtype=np.int64), np.empty((0, 3))
+
+
+def merge_actions(actions):
+    """Combine (ids, velocities) actions into one, later actions override earlier ones for the same vertex."""
+    actions = list(actions)
+    if not actions:
+        return no_action()
+
+    ids = np.concatenate([ids for ids, _ in actions])
+    velocities = np.concatenate([velocities for _, velocities in actions])
+    _, last = np.unique(ids[::-1], return_index=True)
+    keep = len(ids) - 1 - last
+    return ids[keep], np.ascontiguousarray(velocities[keep])
+
+
+def no_motion():
+    """The rigid motion of a gripper that stands still, see grasp.rigid_motion."""
+    return np.zeros(3), np.zeros(3), np.array([0.0, 0.0, 1.0]), 0.0
+
+
+def id_ranges(ids):
+    """Group vertex ids into ranges of consecutive ids.
+
+    Returns:
+        tuple: (R,) first ids and (R,) ids one past the end of the ranges.
+    """
+    ids = np.unique(ids)
+    if len(ids) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    starts = np.flatnonzero(np.concatenate([[True], np.diff(ids) != 1]))
+    ends = np.append(starts[1:], len(ids)) - 1
+    return ids[starts], ids[ends] + 1
+
+
+def action_ranges(ids, velocities):
+    """Group an action into ranges of consecutive vertex ids that have the same velocity.
+
+    Returns:
+        tuple: (R,) first ids, (R,) ids one past the end of the ranges and the (R, 3) velocity of each range.
+    """
+    if len(ids) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((0, 3))
+
+    order = np.argsort(ids, kind="stable")
+    ids = np.asarray(ids)[order]
+    velocities = np.asarray(velocities)[order]
+
+    same_as_previous = (np.diff(ids) == 1) & np.all(np.diff(velocities, axis=0) == 0.0, axis=1)
+    starts = np.flatnonzero(np.concatenate([[True], ~same_as_previous]))
+    ends = np.append(starts[1:], len(ids)) - 1
+    return ids[starts], ids[ends] + 1, velocities[starts]
+
+
+def action_as_dict(ids, velocities):
+    """The {vertex id: velocity} dict that SimulationCIPC.step expects."""
+    return dict(zip(ids.tolist(), velocities))
+
+
+class TrajectoryGripper:
+    """A cube gripper that grasps the cloth at start_frame and moves it along a FoldTrajectory until end_frame.
+
+    It has the same action(cloth) method as the airo_blender_toolkit grippers, but does not need a keyframed Blender
+    object or scene.frame_set. The grasped vertices are those of the faces that overlap the gripper cube at its
+    first pose. They are released at end_frame.
+
+    Args:
+        trajectory (FoldTrajectory): the gripper poses over times in [0, 1].
+        start_frame (int): frame at which the gripper is at the start of the trajectory and grasps.
+        end_frame (int): frame at which the gripper reaches the end of the trajectory and releases.
+        fps (float): frame rate of the simulation.
+        size (float): edge length of the gripper cube.
+    """
+
+    def __init__(self, trajectory, start_frame, end_frame, fps=25, size=0.05):
+        self.trajectory = trajectory
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.dt = 1.0 / fps
+        self.size = size
+        self.grasped = None
+
+    def time(self, frame):
+        """The trajectory time in [0, 1] at a frame."""
+        return np.clip((frame - self.start_frame) / (self.end_frame - self.start_frame), 0.0, 1.0)
+
+    def is_active(self, frame):
+        return self.start_frame <= frame < self.end_frame
+
+    def bounding_box(self, frame):
+        """The minimum and maximum corner of the world-space AABB of the gripper cube at a frame."""
+        transform = self.trajectory.transforms(self.time(frame))[0]
+        corners = transform_points(transform, self.size * CUBE_CORNERS)
+        return corners.min(axis=0), corners.max(axis=0)
+
+    def grasp(self, frame, vertices, faces):
+        """The (G,) ids of the grasped vertices at a frame, grasped on the first active frame, None when inactive."""
+        if not self.is_active(frame):
+            self.grasped = None
+        elif self.grasped is None:
+            self.grasped = GraspIndex(vertices, faces).grasped_vertices(*self.bounding_box(frame))
+        return self.grasped
+
+    def velocities(self, frame, vertices, faces):
+        """The action at a frame, for the cloth with (N, 3) world-space vertices and (F, K) faces.
+
+        Returns:
+            tuple: the (G,) grasped vertex ids and their contiguous (G, 3) velocities during the frame.
+        """
+        if self.grasp(frame, vertices, faces) is None:
+            return no_action()
+
+        transforms = self.trajectory.transforms([self.time(frame), self.time(frame + 1)])
+        velocities = rigid_velocities(vertices[self.grasped], transforms[0], transforms[1], self.dt)
+        return self.grasped, np.ascontiguousarray(velocities)
+
+    def rigid_action(self, frame, vertices, faces):
+        """The action at a frame as the grasped vertex ids and the single rigid motion they share.
+
+        Unlike the velocities, which differ per vertex as soon as the gripper rotates, the motion is one translation
+        and rotation for all grasped vertices, see grasp.rigid_motion.
+
+        Returns:
+            tuple: the (G,) grasped vertex ids and the (velocity, center, axis, angular_velocity) of the gripper.
+        """
+        if self.grasp(frame, vertices, faces) is None:
+            return no_action()[0], no_motion()
+
+        transforms = self.trajectory.transforms([self.time(frame), self.time(frame + 1)])
+        return self.grasped, rigid_motion(transforms[0], transforms[1], self.dt)
+
+    def action(self, cloth, frame=None):
+        """The action as a {vertex id: velocity} dict, for a Blender cloth object at the current scene frame."""
+        if frame is None:
+            import bpy
+
+            frame = bpy.context.scene.frame_current
+
+        faces = get_polygons(cloth.data) if self.grasped is None else None
+        return action_as_dict(*self.velocities(frame, get_world_vertex_coordinates(cloth), faces))
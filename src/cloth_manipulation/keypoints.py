@@ -0,0 +1,47 @@
+import numpy as np
+
+
+class Keypoints:
+    """Named keypoints stored as one contiguous, read-only (K, 3) array.
+
+    Indexing with a name returns a read-only view of that keypoint's row. Because the positions cannot be changed in
+    place, geometry derived from them can be cached safely. To move keypoints, create a new Keypoints object.
+
+    Args:
+        keypoints (dict): name to 3D position, e.g. a mathutils.Vector or np.ndarray.
+    """
+
+    def __init__(self, keypoints):
+        self.names = tuple(keypoints)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        positions = np.empty((len(self.names), 3), dtype=np.float64)
+        for i, name in enumerate(self.names):
+            positions[i] = keypoints[name]
+        positions.setflags(write=False)
+        self.positions = positions
+
+    @classmethod
+    def from_array(cls, names, positions):
+        """Keypoints from a sequence of K names and a (K, 3) array of positions, which is copied."""
+        return cls(dict(zip(names, np.asarray(positions))))
+
+    def __getitem__(self, name):
+        return self.positions[self.index[name]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def keys(self):
+        return self.names
+
+    def items(self):
+        return ((name, self[name]) for name in self.names)
+
+    def __repr__(self):
+        return f"Keypoints({dict(self.items())})"
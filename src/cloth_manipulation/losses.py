@@ -1,6 +1,15 @@
 import numpy as np
 
 
+def squared_distances(positions0, positions1, out=None):
+    """Squared euclidean distances between corresponding positions along the last axis.
+
+    Works on (N, 3) arrays as well as batches of shape (B, N, 3), which are broadcast against (N, 3) or (B, N, 3).
+    """
+    difference = np.subtract(positions0, positions1)
+    return np.einsum("...i,...i->...", difference, difference, out=out)
+
+
 def distances(positions0, positions1):
     return np.linalg.norm(positions0 - positions1, axis=1)
 
@@ -11,10 +20,89 @@ def mean_distance(positions0, positions1):
 
 
 def mean_squared_distance(positions0, positions1):
-    distances_ = distances(positions0, positions1)
-    sq_distances = distances_ ** 2
-    return sq_distances.mean(axis=0)
+    return squared_distances(positions0, positions1).mean(axis=0)
 
 
 def root_mean_squared_distance(positions0, positions1):
     return np.sqrt(mean_squared_distance(positions0, positions1))
+
+
+def batch_mean_distance(positions, target, out=None):
+    """Mean distance of each candidate in a (B, N, 3) batch to a (N, 3) or (B, N, 3) target.
+
+    Args:
+        positions (np.ndarray): (B, N, 3) array of candidate positions, float32 stays float32.
+        target (np.ndarray): (N, 3) target shared by all candidates or (B, N, 3) target per candidate.
+        out (np.ndarray): optional (B,) array to write the losses into.
+
+    Returns:
+        np.ndarray: (B,) array of losses.
+    """
+    distances_ = squared_distances(positions, target)
+    np.sqrt(distances_, out=distances_)
+    return np.mean(distances_, axis=-1, out=out)
+
+
+def batch_mean_squared_distance(positions, target, out=None):
+    """Mean squared distance of each candidate in a batch, see batch_mean_distance."""
+    return np.mean(squared_distances(positions, target), axis=-1, out=out)
+
+
+def batch_root_mean_squared_distance(positions, target, out=None):
+    """Root mean squared distance of each candidate in a batch, see batch_mean_distance."""
+    losses = batch_mean_squared_distance(positions, target, out=out)
+    return np.sqrt(losses, out=losses)
+
+
+class NearestNeighbourIndex:
+    """Spatial index over a set of positions for losses that do not need vertex correspondences.
+
+    Build it once per target and reuse it for all candidates, so each comparison costs O(N log M) instead of O(N M).
+    """
+
+    def __init__(self, positions, workers=1):
+        from scipy.spatial import cKDTree
+
+        self.positions = np.asarray(positions)
+        self.tree = cKDTree(self.positions)
+        self.workers = workers
+
+    def nearest_distances(self, positions):
+        """Distance of each of the (N, 3) positions to its nearest neighbour in the index."""
+        distances_, _ = self.tree.query(positions, workers=self.workers)
+        return distances_
+
+
+def as_nearest_neighbour_index(positions):
+    if isinstance(positions, NearestNeighbourIndex):
+        return positions
+    return NearestNeighbourIndex(positions)
+
+
+def nearest_distances(positions, target):
+    """Distances of positions to their nearest neighbour in target, which can be an array or a prebuilt index."""
+    if isinstance(positions, NearestNeighbourIndex):
+        positions = positions.positions
+    return as_nearest_neighbour_index(target).nearest_distances(positions)
+
+
+def one_sided_mean_distance(positions, target):
+    """Mean distance of positions to their nearest neighbour in target."""
+    return nearest_distances(positions, target).mean(axis=0)
+
+
+def chamfer_distance(positions0, positions1):
+    """Symmetric Chamfer distance: the average of the one-sided mean distances in both directions.
+
+    The arguments can be arrays of positions or prebuilt NearestNeighbourIndex objects, e.g. one for the target.
+    """
+    index0 = as_nearest_neighbour_index(positions0)
+    index1 = as_nearest_neighbour_index(positions1)
+    return 0.5 * (one_sided_mean_distance(index0, index1) + one_sided_mean_distance(index1, index0))
+
+
+def hausdorff_distance(positions0, positions1):
+    """Largest distance from a position in either set to its nearest neighbour in the other set."""
+    index0 = as_nearest_neighbour_index(positions0)
+    index1 = as_nearest_neighbour_index(positions1)
+    return max(nearest_distances(index0, index1).max(), nearest_distances(index1, index0).max())
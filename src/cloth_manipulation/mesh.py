@@ -0,0 +1,150 @@
+import itertools
+
+import numpy as np
+
+
+def get_vertex_coordinates(mesh, out=None):
+    """Read the local coordinates of all vertices of a Blender mesh in bulk.
+
+    Args:
+        mesh (bpy.types.Mesh): the mesh to read from.
+        out (np.ndarray): optional (N, 3) float32 array to read into.
+
+    Returns:
+        np.ndarray: (N, 3) array of vertex coordinates.
+    """
+    if out is None:
+        out = np.empty((len(mesh.vertices), 3), dtype=np.float32)
+    mesh.vertices.foreach_get("co", out.reshape(-1))
+    return out
+
+
+def set_vertex_coordinates(mesh, coordinates):
+    """Write the local coordinates of all vertices of a Blender mesh in bulk."""
+    coordinates = np.ascontiguousarray(coordinates, dtype=np.float32)
+    mesh.vertices.foreach_set("co", coordinates.reshape(-1))
+    mesh.update()
+
+
+def get_world_vertex_coordinates(objects, out=None, dtype=np.float64):
+    """Read the world-space coordinates of the vertices of one or more Blender objects.
+
+    The local coordinates are read in bulk with foreach_get and transformed with matrix_world as a single matmul,
+    so no mathutils.Vector is created per vertex.
+
+    Args:
+        objects: a Blender object, or a sequence of Blender objects that all have the same number of vertices.
+        out (np.ndarray): optional output array, e.g. to reuse a buffer across frames.
+        dtype: dtype of the output array when out is not given.
+
+    Returns:
+        np.ndarray: (N, 3) array for a single object, (B, N, 3) array for a sequence of B objects.
+    """
+    single = not isinstance(objects, (list, tuple))
+    objects = [objects] if single else objects
+
+    n_vertices = len(objects[0].data.vertices)
+    for obj in objects:
+        if len(obj.data.vertices) != n_vertices:
+            raise ValueError(f"{obj.name} has {len(obj.data.vertices)} vertices instead of {n_vertices}.")
+
+    shape = (len(objects), n_vertices, 3)
+    if out is None:
+        out = np.empty(shape[1:] if single else shape, dtype=dtype)
+    batch = out.reshape(shape)
+
+    local_coordinates = np.empty((n_vertices, 3), dtype=np.float32)
+    for obj, world_coordinates in zip(objects, batch):
+        get_vertex_coordinates(obj.data, out=local_coordinates)
+        matrix_world = np.array(obj.matrix_world)
+        np.matmul(local_coordinates, matrix_world[:3, :3].T, out=world_coordinates)
+        world_coordinates += matrix_world[:3, 3]
+
+    return out
+
+
+def get_triangles(mesh):
+    """Read the (F, 3) vertex indices of a triangulated Blender mesh in bulk."""
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    if np.any(loop_totals != 3):
+        raise ValueError(f"{mesh.name} is not triangulated.")
+
+    triangles = np.empty((len(mesh.polygons), 3), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", triangles.reshape(-1))
+    return triangles
+
+
+def make_mesh_object(name, vertices, triangles):
+    """Create a Blender object from vertex and triangle arrays, filling the mesh in bulk instead of from_pydata."""
+    import bpy
+
+    n_triangles = len(triangles)
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1))
+    mesh.loops.add(3 * n_triangles)
+    mesh.loops.foreach_set("vertex_index", np.ascontiguousarray(triangles, dtype=np.int32).reshape(-1))
+    mesh.polygons.add(n_triangles)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, 3 * n_triangles, 3, dtype=np.int32))
+    mesh.polygons.foreach_set("loop_total", np.full(n_triangles, 3, dtype=np.int32))
+    mesh.update(calc_edges=True)
+    mesh.validate()
+
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+
+def add_shape_key_frames(obj, frames, start_frame=0, name="frame", frame_numbers=None):
+    """Store a sequence of vertex coordinates as shape keys of a single object, one key per animation frame.
+
+    Each shape key is filled in bulk with foreach_set and keyframed to have value 1.0 on its own frame only, so the
+    object shows one state per frame instead of needing a separate object per frame.
+
+    Args:
+        obj (bpy.types.Object): the object to animate, its current mesh becomes the basis shape key.
+        frames: iterable of (N, 3) arrays of local vertex coordinates, e.g. a FrameStore.
+        start_frame (int): animation frame of the first coordinates, the following ones are on consecutive frames.
+        name (str): prefix of the shape key names, the frame number is appended.
+        frame_numbers (list): increasing animation frame of each coordinates, overrides start_frame. With gaps between
+            them, each shape key is shown until the frame of the next one.
+
+    Returns:
+        list: the new shape keys.
+    """
+    import bpy
+
+    if obj.data.shape_keys is None:
+        obj.shape_key_add(name="Basis", from_mix=False)
+
+    shape_keys = obj.data.shape_keys
+    if shape_keys.animation_data is None:
+        shape_keys.animation_data_create()
+    if shape_keys.animation_data.action is None:
+        shape_keys.animation_data.action = bpy.data.actions.new(f"{obj.name} Frames")
+    action = shape_keys.animation_data.action
+
+    if frame_numbers is None:
+        frame_numbers = itertools.count(start_frame)
+    frame_numbers = iter(frame_numbers)
+
+    key_blocks = []
+    frame = next(frame_numbers, None)
+    for coordinates in frames:
+        if frame is None:
+            raise ValueError("There are fewer frame numbers than frames.")
+        next_frame = next(frame_numbers, None)
+        key_block = obj.shape_key_add(name=f"{name}{frame}", from_mix=False)
+        key_block.data.foreach_set("co", np.ascontiguousarray(coordinates, dtype=np.float32).reshape(-1))
+
+        hide_frame = frame + 1 if next_frame is None else next_frame
+        fcurve = action.fcurves.new(f'key_blocks["{key_block.name}"].value')
+        fcurve.keyframe_points.add(3)
+        fcurve.keyframe_points.foreach_set("co", [frame - 1, 0.0, frame, 1.0, hide_frame, 0.0])
+        for keyframe_point in fcurve.keyframe_points:
+            keyframe_point.interpolation = "CONSTANT"
+        key_blocks.append(key_block)
+        frame = next_frame
+
+    return key_blocks
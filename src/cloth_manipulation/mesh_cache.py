@@ -0,0 +1,102 @@
+"""On-disk cache of triangulated, keypointed shirt meshes."""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from cloth_manipulation.mesh import get_triangles, get_vertex_coordinates, make_mesh_object
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cloth_manipulation", "meshes")
+
+# Part of every cache key, increment it when the way shirts are built or stored changes.
+CACHE_VERSION = 1
+
+
+def cache_key(**parameters):
+    """Content address of a mesh: a hash of the parameters it was built from."""
+    encoded = json.dumps(parameters, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:24]
+
+
+def save_mesh(cache_dir, key, vertices, triangles, keypoint_ids):
+    """Store a mesh entry. It is written to a temporary directory first, so concurrent runs never see half of it."""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(entry_dir):
+        return
+
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir)
+    np.save(os.path.join(tmp_dir, "vertices.npy"), np.asarray(vertices, dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "triangles.npy"), np.asarray(triangles, dtype=np.int32))
+    keypoint_ids = {name: [int(id) for id in ids] for name, ids in keypoint_ids.items()}
+    with open(os.path.join(tmp_dir, "keypoint_ids.json"), "w") as f:
+        json.dump(keypoint_ids, f)
+
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:  # Another process stored the same entry in the meantime.
+        for filename in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, filename))
+        os.rmdir(tmp_dir)
+
+
+def load_mesh(cache_dir, key):
+    """Load a mesh entry as read-only memory mapped arrays, returns None if it is not cached."""
+    entry_dir = os.path.join(cache_dir, key)
+    if not os.path.exists(entry_dir):
+        return None
+
+    vertices = np.load(os.path.join(entry_dir, "vertices.npy"), mmap_mode="r")
+    triangles = np.load(os.path.join(entry_dir, "triangles.npy"), mmap_mode="r")
+    with open(os.path.join(entry_dir, "keypoint_ids.json")) as f:
+        keypoint_ids = json.load(f)
+    return vertices, triangles, keypoint_ids
+
+
+def make_shirt(shape=None, minimum_triangle_density=20000, z_offset=0.0, cache_dir=DEFAULT_CACHE_DIR):
+    """Create a triangulated shirt from the cache, building and caching it first if it is not cached yet.
+
+    The shirt is always loaded from the cache entry, so the object is the same on the first run and on later runs.
+    The key includes the airo_blender_toolkit version, so an upgrade rebuilds the meshes.
+
+    Args:
+        shape (dict): keyword arguments for abt.PolygonalShirt.
+        minimum_triangle_density (int): passed to abt.triangulate_blender_object.
+        z_offset (float): height at which the shirt is placed, e.g. to offset it from the ground.
+        cache_dir (str): directory of the mesh cache.
+
+    Returns:
+        abt.KeypointedObject: the shirt, with its transformation already applied to the mesh.
+    """
+    import airo_blender_toolkit as abt
+    import bpy
+
+    shape = {} if shape is None else shape
+    key = cache_key(
+        shape=shape,
+        minimum_triangle_density=minimum_triangle_density,
+        z_offset=z_offset,
+        version=CACHE_VERSION,
+        abt_version=getattr(abt, "__version__", None),
+    )
+
+    if load_mesh(cache_dir, key) is None:
+        shirt = abt.PolygonalShirt(**shape)
+        shirt_obj = shirt.blender_obj
+        abt.triangulate_blender_object(shirt_obj, minimum_triangle_density=minimum_triangle_density)
+        shirt_obj.location.z = z_offset
+        shirt.persist_transformation_into_mesh()
+
+        vertices = get_vertex_coordinates(shirt_obj.data)
+        triangles = get_triangles(shirt_obj.data)
+        save_mesh(cache_dir, key, vertices, triangles, shirt.keypoint_ids)
+
+        mesh = shirt_obj.data
+        bpy.data.objects.remove(shirt_obj)
+        bpy.data.meshes.remove(mesh)
+
+    vertices, triangles, keypoint_ids = load_mesh(cache_dir, key)
+    shirt_obj = make_mesh_object("Shirt", vertices, triangles)
+    return abt.KeypointedObject(shirt_obj, keypoint_ids)
@@ -0,0 +1,135 @@
+"""Vectorized evaluation of the gripper paths of the fold trajectories."""
+import numpy as np
+
+from cloth_manipulation.geometry import project_point_on_line, rotation_matrices
+
+
+def minimum_jerk(t):
+    """Minimum jerk time parametrization, maps times in [0, 1] to path parameters in [0, 1]."""
+    t = np.clip(np.asarray(t, dtype=np.float64), 0.0, 1.0)
+    return t**3 * (10.0 - 15.0 * t + 6.0 * t**2)
+
+
+def quadratic_bezier(control_points, s):
+    """Points on quadratic Bezier curves.
+
+    Args:
+        control_points (np.ndarray): (..., 3, 3) array, the three control points of each curve.
+        s (np.ndarray): (T,) curve parameters in [0, 1].
+
+    Returns:
+        np.ndarray: (..., T, 3) array of points.
+    """
+    control_points = np.asarray(control_points, dtype=np.float64)
+    s = np.asarray(s, dtype=np.float64)[:, np.newaxis]
+    weights = [(1.0 - s) ** 2, 2.0 * s * (1.0 - s), s**2]
+    p0, p1, p2 = (control_points[..., i, np.newaxis, :] for i in range(3))
+    return weights[0] * p0 + weights[1] * p1 + weights[2] * p2
+
+
+def fold_rotation_sign(start_position, point_on_line, line_direction):
+    """Direction of rotation about the fold line, +1.0 or -1.0, for which the gripper first moves up."""
+    radius = start_position - project_point_on_line(start_position, point_on_line, line_direction)
+    return 1.0 if np.cross(line_direction, radius)[2] >= 0.0 else -1.0
+
+
+def elliptical_arc(start_pose, point_on_line, line_direction, end_angle=170, scale=1.0, tilt_angle=0, s=None):
+    """Poses on an elliptical arc that folds the start pose over the fold line.
+
+    With scale 1.0 the arc is the circle traced by rotating the start pose about the fold line, over the top, by
+    end_angle degrees. Scale stretches the arc in the direction perpendicular to the start radius and the fold line,
+    so it changes the height of the arc, and of its end unless end_angle is 180. The tilt rotates the arc about the
+    line from its start to its end. The orientation rotates along with the circle and is not affected by scale and
+    tilt.
+
+    Args:
+        start_pose (np.ndarray): 4x4 pose of the gripper at the start.
+        point_on_line: a point on the fold line.
+        line_direction: unit direction of the fold line.
+        end_angle (float): angle in degrees of the rotation about the fold line at the end of the arc.
+        scale (float): ratio between the height and the radius of the arc.
+        tilt_angle (float): angle in degrees of the rotation about the line from start to end.
+        s (np.ndarray): (T,) arc parameters in [0, 1].
+
+    Returns:
+        tuple: (T, 3) positions and (T, 3, 3) orientations.
+    """
+    start_pose = np.asarray(start_pose, dtype=np.float64)
+    line_direction = np.asarray(line_direction, dtype=np.float64)
+    start_position = start_pose[:3, 3]
+
+    center = project_point_on_line(start_position, point_on_line, line_direction)
+    radius = start_position - center
+    sign = fold_rotation_sign(start_position, point_on_line, line_direction)
+    normal = sign * np.cross(line_direction, radius)
+
+    end_angle = np.deg2rad(end_angle)
+    angles = end_angle * np.asarray(s, dtype=np.float64)
+    positions = center + np.multiply.outer(np.cos(angles), radius) + scale * np.multiply.outer(np.sin(angles), normal)
+
+    if tilt_angle != 0:
+        end_position = center + np.cos(end_angle) * radius + scale * np.sin(end_angle) * normal
+        chord = end_position - start_position
+        tilt = rotation_matrices(chord / np.linalg.norm(chord), np.deg2rad(tilt_angle))
+        positions = (positions - start_position) @ tilt.T + start_position
+
+    orientations = rotation_matrices(line_direction, sign * angles) @ start_pose[:3, :3]
+    return positions, orientations
+
+
+def fold_end_pose(start_pose, point_on_line, line_direction, end_angle=170):
+    """The 4x4 pose at the end of the elliptical_arc with scale 1.0 and no tilt.
+
+    It is the start pose rotated over the top of the fold line by end_angle degrees.
+    """
+    start_pose = np.asarray(start_pose, dtype=np.float64)
+    sign = fold_rotation_sign(start_pose[:3, 3], point_on_line, line_direction)
+    rotation = rotation_matrices(line_direction, sign * np.deg2rad(end_angle))
+
+    end_pose = np.identity(4)
+    end_pose[:3, :3] = rotation @ start_pose[:3, :3]
+    end_pose[:3, 3] = rotation @ (start_pose[:3, 3] - point_on_line) + point_on_line
+    return end_pose
+
+
+def bezier_fold_control_points(
+    start_position, end_positions, point_on_line, line_direction, height_ratios, tilt_angles
+):
+    """Control points of the Bezier fold trajectories for a grid of parameters.
+
+    The middle control point is raised above the projection of the start position on the fold line, by twice the
+    height ratio times the distance from start to fold line, because the curve lies halfway between the middle
+    control point and the ground. It is then tilted about the line from start to end by the tilt angle.
+
+    Args:
+        start_position: start position of the gripper, shared by all trajectories.
+        end_positions (np.ndarray): (G, 3) or (3,) end positions of the gripper.
+        point_on_line: a point on the fold line.
+        line_direction: unit direction of the fold line.
+        height_ratios (np.ndarray): (G,) height ratios.
+        tilt_angles (np.ndarray): (G,) tilt angles in degrees.
+
+    Returns:
+        np.ndarray: (G, 3, 3) array with the start, middle and end control points of each trajectory.
+    """
+    start_position = np.asarray(start_position, dtype=np.float64)
+    height_ratios = np.atleast_1d(np.asarray(height_ratios, dtype=np.float64))
+    tilt_angles = np.broadcast_to(np.asarray(tilt_angles, dtype=np.float64), height_ratios.shape)
+    end_positions = np.broadcast_to(np.asarray(end_positions, dtype=np.float64), height_ratios.shape + (3,))
+
+    mid_position = project_point_on_line(start_position, point_on_line, line_direction)
+    start_to_fold_line_distance = np.linalg.norm(start_position - mid_position)
+
+    raised_mid_positions = np.repeat(mid_position[np.newaxis], len(height_ratios), axis=0)
+    raised_mid_positions[:, 2] += height_ratios * start_to_fold_line_distance * 2
+
+    start_to_end = end_positions - start_position
+    start_to_end /= np.linalg.norm(start_to_end, axis=-1, keepdims=True)
+    tilts = rotation_matrices(start_to_end, np.deg2rad(tilt_angles))
+    tilted_mid_positions = np.einsum("gij,gj->gi", tilts, raised_mid_positions - start_position) + start_position
+
+    control_points = np.empty((len(height_ratios), 3, 3))
+    control_points[:, 0] = start_position
+    control_points[:, 1] = tilted_mid_positions
+    control_points[:, 2] = end_positions
+    return control_points
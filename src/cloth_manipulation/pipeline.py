@@ -0,0 +1,205 @@
+import os
+
+import bpy
+import numpy as np
+from cipc.dirs import ensure_output_filepaths, save_dict_as_json
+from cipc.simulator import SimulationCIPC
+
+from cloth_manipulation.frame_store import FrameStoreWriter
+from cloth_manipulation.grippers import TrajectoryGripper
+from cloth_manipulation.losses import mean_distance
+from cloth_manipulation.mesh import add_shape_key_frames, get_triangles, get_world_vertex_coordinates, make_mesh_object
+from cloth_manipulation.scene import setup_camera_topdown, setup_enviroment_texture, setup_ground
+
+STAGES = ("dress", "simulate", "score", "save_blend", "save_state", "render")
+
+MODES = {
+    "full": ("dress", "simulate", "score", "save_blend", "render"),
+    "metrics": ("simulate", "score"),
+    "deferred": ("simulate", "score", "save_state"),
+}
+
+CLOTH_OUTPUTS = ("objects", "shape_keys")
+
+FPS = 25
+
+
+def setup_scene(dress=True):
+    """Add the ground and the top-down camera, and the HDRI lighting if the result will be dressed."""
+    ground = setup_ground()
+    setup_camera_topdown()
+    setup_enviroment_texture(enabled=dress)
+    return ground
+
+
+class FoldPipeline:
+    """The stages of a fold experiment run, each of which can be turned on or off.
+
+    The stages are:
+        dress: shirt materials, HDRI lighting and visualizations of fold lines and paths, only needed to render.
+        simulate: run C-IPC with the gripper actions.
+        score: calculate the losses and write them to losses.json.
+        save_blend: save the .blend file of the run.
+        save_state: save the simulated frames as a frame store in the "frames" directory of the run, to render the
+            run later in a batch, see cloth_manipulation.frame_store.
+        render: render result.png.
+
+    The modes are presets: "full" does everything the experiments always did, "metrics" only produces losses.json
+    and "deferred" also writes the frame store so only the best runs need to be rendered.
+
+    By default, the simulated frames are collected into a single cloth object with one shape key per frame. The
+    objects that C-IPC creates for each frame are removed once the simulation has finished. Set cloth_output to
+    "objects" to keep those objects instead.
+
+    Args:
+        run_dir (str): output directory of the run, see cipc.dirs.ensure_output_filepaths.
+        config (dict): parameters of the run, saved in the run directory.
+        mode (str): one of the keys of MODES.
+        stages (iterable): explicit set of stages, overrides mode.
+        cloth_output (str): "shape_keys" or "objects", how the simulated frames are kept in the scene.
+    """
+
+    def __init__(self, run_dir=None, config=None, mode="full", stages=None, cloth_output="shape_keys"):
+        self.stages = set(MODES[mode] if stages is None else stages)
+        unknown_stages = self.stages - set(STAGES)
+        if unknown_stages:
+            raise ValueError(f"Unknown stages {unknown_stages}, choose from {STAGES}.")
+        if cloth_output not in CLOTH_OUTPUTS:
+            raise ValueError(f"Unknown cloth output {cloth_output}, choose from {CLOTH_OUTPUTS}.")
+        self.cloth_output = cloth_output
+
+        self.filepaths = ensure_output_filepaths(run_dir, config=config)
+        self.simulation = None
+        self.animated_shirt = None
+        self.frames = None
+
+    def __contains__(self, stage):
+        return stage in self.stages
+
+    def setup_scene(self):
+        return setup_scene(dress="dress" in self)
+
+    def simulate(self, shirt_obj, ground_obj, cloth_material, grippers, friction_coefficient=None):
+        """Run C-IPC from scene.frame_start to scene.frame_end and return the final simulated shirt object.
+
+        With the "shape_keys" cloth output, the returned object is the animated shirt, its mesh holds the final state.
+        """
+        if "simulate" not in self:
+            return shirt_obj
+
+        scene = bpy.context.scene
+        simulation = SimulationCIPC(self.filepaths, FPS)
+        if friction_coefficient is not None:
+            simulation.friction_coefficient = friction_coefficient
+        simulation.add_cloth(shirt_obj, cloth_material)
+        simulation.add_collider(ground_obj, friction_coefficient=0.8)
+        simulation.initialize_cipc()
+
+        frame_objects = simulation.blender_objects_output[shirt_obj.name]
+        n_frames = scene.frame_end - scene.frame_start + 1
+        frames = np.empty((n_frames, len(shirt_obj.data.vertices), 3), dtype=np.float32)
+        get_world_vertex_coordinates(shirt_obj, out=frames[0])
+
+        # Grippers that follow a trajectory get the frame directly, others need the scene to be evaluated at it. The
+        # cheap frame_current update still keeps the current frame right for code that reads it.
+        needs_frame_set = not all(isinstance(gripper, TrajectoryGripper) for gripper in grippers)
+        simulated_shirt = shirt_obj
+
+        for frame in range(scene.frame_start, scene.frame_end):
+            action = {}
+            if needs_frame_set:
+                scene.frame_set(frame)
+            else:
+                scene.frame_current = frame
+            for gripper in grippers:
+                if isinstance(gripper, TrajectoryGripper):
+                    action |= gripper.action(simulated_shirt, frame)
+                else:
+                    action |= gripper.action(simulated_shirt)
+            simulation.step(action)
+            simulated_shirt = frame_objects[frame + 1]
+            get_world_vertex_coordinates(simulated_shirt, out=frames[frame + 1 - scene.frame_start])
+
+        self.simulation = simulation
+        self.frames = frames
+        if self.cloth_output != "shape_keys":
+            return simulated_shirt
+
+        triangles = get_triangles(shirt_obj.data)
+        self.animated_shirt = make_mesh_object(f"{shirt_obj.name} Simulated", frames[-1], triangles)
+        add_shape_key_frames(self.animated_shirt, frames, scene.frame_start)
+
+        # The simulation is finished, so the objects C-IPC made for each frame can go in a single pass.
+        remove_objects([obj for obj in frame_objects.values() if obj is not shirt_obj])
+        return self.animated_shirt
+
+    def score(self, target, simulated_shirt, initial_shirt):
+        if "score" not in self:
+            return None
+
+        targets = get_world_vertex_coordinates(target)
+        simulated_positions = get_world_vertex_coordinates(simulated_shirt)
+        initial_positions = get_world_vertex_coordinates(initial_shirt)
+
+        losses = {
+            "mean_distance": mean_distance(targets, simulated_positions),
+        }
+
+        print("Mean distance (initial):", mean_distance(targets, initial_positions))
+        print("Mean distance (result):", losses["mean_distance"])
+
+        save_dict_as_json(self.filepaths["losses"], losses)
+        return losses
+
+    def dress_result(self, shirt_obj, shirt_material, objects_to_hide):
+        """Give all simulated shirts the shirt material and hide the input objects."""
+        if "dress" not in self:
+            return
+
+        if self.simulation is not None and self.animated_shirt is None:
+            for simulated_shirt in self.simulation.blender_objects_output[shirt_obj.name].values():
+                simulated_shirt.data.materials.append(shirt_material.blender_obj)
+        if self.animated_shirt is not None:
+            self.animated_shirt.data.materials.append(shirt_material.blender_obj)
+
+        scene = bpy.context.scene
+        scene.frame_set(scene.frame_end)
+
+        for object in objects_to_hide:
+            object.hide_viewport = True
+            object.hide_render = True
+
+    def persist(self, simulated_shirt):
+        run_dir = self.filepaths["run"]
+
+        if "save_state" in self:
+            frames = self.frames
+            if frames is None:  # Nothing was simulated, the given state is the only frame.
+                frames = get_world_vertex_coordinates(simulated_shirt, dtype=np.float32)[np.newaxis]
+
+            triangles = get_triangles(simulated_shirt.data)
+            metadata = {"fps": FPS, "frame_start": bpy.context.scene.frame_start}
+            store_path = os.path.join(run_dir, "frames")
+            with FrameStoreWriter(store_path, triangles, frames.shape[1], len(frames), metadata=metadata) as writer:
+                for positions in frames:
+                    writer.append(positions)
+
+        if "save_blend" in self:
+            bpy.ops.wm.save_as_mainfile(filepath=self.filepaths["blend"])
+
+    def render(self, adaptive_threshold=0.1):
+        if "render" not in self:
+            return
+
+        scene = bpy.context.scene
+        scene.cycles.adaptive_threshold = adaptive_threshold
+        scene.render.filepath = os.path.join(self.filepaths["run"], "result.png")
+        bpy.ops.render.render(write_still=True)
+
+
+def remove_objects(objects):
+    """Delete Blender objects together with their meshes."""
+    for obj in objects:
+        mesh = obj.data
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
@@ -0,0 +1,113 @@
+"""Deferred batch rendering of stored fold results, see experiments/render_top_runs.py."""
+import os
+
+import bpy
+import numpy as np
+
+from cloth_manipulation.frame_store import FrameStore
+from cloth_manipulation.mesh import make_mesh_object, set_vertex_coordinates
+from cloth_manipulation.scene import setup_camera_topdown, setup_enviroment_texture, setup_ground, setup_shirt_material
+from cloth_manipulation.sweep import load_results
+
+RENDER_PRESETS = {
+    "full": {"resolution": (1024, 512), "samples": None, "adaptive_threshold": 0.1},
+    "thumbnail": {"resolution": (256, 128), "samples": 32, "adaptive_threshold": 0.2},
+}
+
+
+def has_run_state(run_dir):
+    """Whether a run saved its frames, which only the save_state stage does, e.g. in the deferred mode."""
+    return os.path.exists(os.path.join(run_dir, "frames", "header.json"))
+
+
+def load_run_state(run_dir):
+    """The (N, 3) final vertex positions and (F, 3) triangles of the frame store saved by the save_state stage."""
+    store = FrameStore(os.path.join(run_dir, "frames"))
+    return store[-1], store.triangles
+
+
+def select_top_runs(results, k, loss="mean_distance"):
+    """The k results with the lowest loss, e.g. from cloth_manipulation.sweep.load_results.
+
+    Results without a value for the loss, e.g. of failed runs, are skipped.
+    """
+    results = [result for result in results if result.get(loss) is not None]
+    return sorted(results, key=lambda result: result[loss])[:k]
+
+
+class BatchRenderer:
+    """Render many cloth states that share one topology without rebuilding the scene.
+
+    The ground, camera, HDRI and shirt material are set up once. A single shirt object is created from the shared
+    triangles and each render only writes new vertex coordinates into it with foreach_set.
+
+    Args:
+        triangles (np.ndarray): (F, 3) vertex indices shared by all states.
+        n_vertices (int): number of vertices of each state.
+        preset (str): one of the keys of RENDER_PRESETS.
+        adaptive_threshold (float): overrides the adaptive sampling threshold of the preset.
+        hdri_name (str): the HDRI that lights the scene.
+    """
+
+    def __init__(
+        self, triangles, n_vertices, preset="thumbnail", adaptive_threshold=None, hdri_name="aviation_museum"
+    ):
+        import blenderproc as bproc
+
+        settings = RENDER_PRESETS[preset]
+        if adaptive_threshold is None:
+            adaptive_threshold = settings["adaptive_threshold"]
+
+        setup_ground()
+        setup_camera_topdown()
+        setup_enviroment_texture(hdri_name)
+
+        self.shirt_obj = make_mesh_object("Shirt", np.zeros((n_vertices, 3), dtype=np.float32), triangles)
+        setup_shirt_material(bproc.types.MeshObject(self.shirt_obj))
+
+        scene = bpy.context.scene
+        scene.render.resolution_x, scene.render.resolution_y = settings["resolution"]
+        scene.render.resolution_percentage = 100
+        if settings["samples"] is not None:
+            scene.cycles.samples = settings["samples"]
+        scene.cycles.adaptive_threshold = adaptive_threshold
+
+    def render(self, positions, filepath):
+        """Render the shirt with the given (N, 3) world-space vertex positions to filepath."""
+        if len(positions) != len(self.shirt_obj.data.vertices):
+            raise ValueError(f"Got {len(positions)} positions for a shirt with {len(self.shirt_obj.data.vertices)}.")
+
+        set_vertex_coordinates(self.shirt_obj.data, positions)
+        scene = bpy.context.scene
+        scene.render.filepath = filepath
+        bpy.ops.render.render(write_still=True)
+        return filepath
+
+    def render_runs(self, run_dirs, filename="thumbnail.png"):
+        """Render the final state of each run directory into that directory and return the image paths."""
+        filepaths = []
+        for run_dir in run_dirs:
+            positions, _ = load_run_state(run_dir)
+            filepaths.append(self.render(positions, os.path.join(run_dir, filename)))
+        return filepaths
+
+
+def render_top_runs(output_dir, k, preset="thumbnail", adaptive_threshold=None, loss="mean_distance"):
+    """Render the k best runs of a local sweep, see cloth_manipulation.sweep.run_sweep.
+
+    Only runs that saved their state can be rendered, the others are skipped with a message.
+    """
+    results = select_top_runs(load_results(os.path.join(output_dir, "results.sqlite")), k, loss)
+    run_dirs = []
+    for result in results:
+        if has_run_state(result["run_dir"]):
+            run_dirs.append(result["run_dir"])
+        else:
+            print(f"Skipping {result['run_dir']}: it has no saved state, run the sweep with -m deferred to save it.")
+    if not run_dirs:
+        return []
+
+    positions, triangles = load_run_state(run_dirs[0])
+    renderer = BatchRenderer(triangles, len(positions), preset, adaptive_threshold)
+    filename = "result.png" if preset == "full" else f"{preset}.png"
+    return renderer.render_runs(run_dirs, filename)
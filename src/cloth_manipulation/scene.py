@@ -1,4 +1,10 @@
+import fcntl
+import glob
+import hashlib
+import json
 import os
+import urllib.error
+import urllib.request
 
 import airo_blender_toolkit as abt
 import blenderproc as bproc
@@ -45,8 +51,109 @@ def setup_camera_topdown():
     scene.render.resolution_y = 512
 
 
-def setup_enviroment_texture():
-    hdri_name = "aviation_museum"
-    assets_path = os.path.join(os.path.expanduser("~"), "assets")
-    hdri_path = abt.download_hdri(hdri_name, assets_path, res="1k")
+def default_assets_path():
+    """Shared asset cache, set CLOTH_MANIPULATION_ASSETS to e.g. a directory on a shared drive of a cluster."""
+    return os.environ.get("CLOTH_MANIPULATION_ASSETS", os.path.join(os.path.expanduser("~"), "assets"))
+
+
+def is_offline():
+    """Offline mode is enabled by setting CLOTH_MANIPULATION_OFFLINE to 1."""
+    return os.environ.get("CLOTH_MANIPULATION_OFFLINE", "0") == "1"
+
+
+def file_checksum(path, algorithm="sha256"):
+    checksum = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def find_cached_hdri(hdri_name, assets_path, res="1k"):
+    """Path of an HDRI file that is already in the assets directory, e.g. downloaded before it had a record."""
+    for extension in ("hdr", "exr"):
+        paths = glob.glob(os.path.join(assets_path, "**", f"{hdri_name}_{res}.{extension}"), recursive=True)
+        if paths:
+            return sorted(paths)[0]
+    return None
+
+
+def verify_download(path, hdri_name, res="1k"):
+    """Raise an OSError if a downloaded HDRI does not have the size and MD5 that Poly Haven lists for it.
+
+    If the Poly Haven API cannot be reached, only check that the file is not empty.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        raise OSError(f"Download of HDRI {hdri_name} ({res}) to {path} is empty.")
+
+    extension = os.path.splitext(path)[1][1:]
+    try:
+        with urllib.request.urlopen(f"https://api.polyhaven.com/files/{hdri_name}", timeout=30) as response:
+            expected = json.load(response)["hdri"][res][extension]
+    except (urllib.error.URLError, OSError, ValueError, KeyError):
+        return
+
+    if size != expected["size"] or file_checksum(path, "md5") != expected["md5"]:
+        raise OSError(f"Download of HDRI {hdri_name} ({res}) to {path} is incomplete or corrupt.")
+
+
+def ensure_hdri(hdri_name, assets_path=None, res="1k", offline=None):
+    """Path to an HDRI in the asset cache, it is only downloaded if it is missing or fails its checksum.
+
+    A lock file makes concurrent workers wait for a single download instead of racing on the same file. Next to each
+    HDRI, a small JSON record stores its path and checksum. An HDRI that is in the cache without a record, e.g. from
+    before records existed, is adopted. A download is checked against the size and MD5 listed by Poly Haven before
+    its record is written.
+
+    Args:
+        hdri_name (str): name of the HDRI on Poly Haven.
+        assets_path (str): cache directory, see default_assets_path.
+        res (str): resolution of the HDRI, e.g. "1k".
+        offline (bool): never download, raise FileNotFoundError if the HDRI is not cached. See is_offline.
+    """
+    if assets_path is None:
+        assets_path = default_assets_path()
+    if offline is None:
+        offline = is_offline()
+
+    os.makedirs(assets_path, exist_ok=True)
+    record_path = os.path.join(assets_path, f"{hdri_name}_{res}.json")
+
+    with open(os.path.join(assets_path, f"{hdri_name}_{res}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        if os.path.exists(record_path):
+            with open(record_path) as f:
+                record = json.load(f)
+            if os.path.exists(record["path"]) and file_checksum(record["path"]) == record["sha256"]:
+                return record["path"]
+
+        hdri_path = None if os.path.exists(record_path) else find_cached_hdri(hdri_name, assets_path, res)
+        if hdri_path is None:
+            if offline:
+                message = f"HDRI {hdri_name} ({res}) is not cached in {assets_path} and offline mode is on."
+                raise FileNotFoundError(message)
+
+            hdri_path = abt.download_hdri(hdri_name, assets_path, res=res)
+            try:
+                verify_download(hdri_path, hdri_name, res)
+            except OSError:
+                os.remove(hdri_path)
+                raise
+
+        with open(record_path, "w") as f:
+            json.dump({"path": hdri_path, "sha256": file_checksum(hdri_path)}, f)
+
+    return hdri_path
+
+
+def setup_enviroment_texture(hdri_name="aviation_museum", assets_path=None, offline=None, enabled=True):
+    """Light the scene with an HDRI from the asset cache, see ensure_hdri.
+
+    Set enabled to False to skip the environment lighting entirely, e.g. for runs that will not be rendered.
+    """
+    if not enabled:
+        return
+    hdri_path = ensure_hdri(hdri_name, assets_path, offline=offline)
     abt.load_hdri(hdri_path)
@@ -0,0 +1,266 @@
+"""Cloth simulator backends behind one interface."""
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from cloth_manipulation.grippers import action_as_dict, merge_actions, no_action
+
+GRAVITY = np.array([0.0, 0.0, -9.81])
+
+
+def as_action(action):
+    """Convert a {vertex id: velocity} dict or None to an (ids, velocities) tuple of arrays."""
+    if action is None:
+        return no_action()
+    if isinstance(action, dict):
+        ids = np.fromiter(action.keys(), dtype=np.int64, count=len(action))
+        return ids, np.array(list(action.values()), dtype=np.float64).reshape(-1, 3)
+    return action
+
+
+class SimulatorBackend(ABC):
+    """Interface of the cloth simulators the fold experiments can run on.
+
+    Actions are (ids, velocities) tuples as returned by TrajectoryGripper.velocities or {vertex id: velocity} dicts.
+    Positions are world-space (N, 3) arrays in Blender's Z-up coordinates.
+
+    Args:
+        fps (float): frame rate, step advances the simulation by 1 / fps seconds.
+    """
+
+    def __init__(self, fps=25):
+        self.fps = fps
+
+    def initialize(self):
+        """Prepare the simulation once the cloth and colliders are added, before positions or step are used."""
+
+    @abstractmethod
+    def add_cloth(self, vertices, triangles, material=None):
+        """Add the cloth as (N, 3) world-space vertices and (F, 3) triangles, with a cipc.materials material."""
+
+    @abstractmethod
+    def add_collider(self, vertices, triangles, friction_coefficient=0.8):
+        """Add a static collider mesh."""
+
+    @abstractmethod
+    def step(self, action=None):
+        """Advance one frame while the vertices of the action move with the given velocities."""
+
+    @abstractmethod
+    def positions(self):
+        """The (N, 3) cloth vertex positions after the last step."""
+
+
+def unique_edges(triangles):
+    """The (E, 2) vertex pairs of the edges of a triangle mesh, each edge once."""
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    return np.unique(np.sort(edges, axis=1), axis=0)
+
+
+def bending_pairs(triangles):
+    """The (B, 2) vertices opposite of each interior edge, in the two triangles that share it."""
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    opposite = np.concatenate([triangles[:, 2], triangles[:, 0], triangles[:, 1]])
+    edges = np.sort(edges, axis=1)
+
+    order = np.lexsort((edges[:, 1], edges[:, 0]))
+    edges, opposite = edges[order], opposite[order]
+    shared = np.flatnonzero(np.all(edges[1:] == edges[:-1], axis=1))
+    return np.stack([opposite[shared], opposite[shared + 1]], axis=1)
+
+
+def vertex_areas(vertices, triangles):
+    """The (N,) area of the cloth that each vertex represents, a third of the area of its triangles."""
+    a, b, c = np.moveaxis(vertices[triangles], 1, 0)
+    triangle_areas = 0.5 * np.linalg.norm(np.cross(b - a, c - a), axis=1)
+    return np.bincount(triangles.ravel(), np.repeat(triangle_areas, 3), minlength=len(vertices)) / 3.0
+
+
+def scatter_add(n, indices, values):
+    """Sum (M, 3) values into an (n, 3) array at indices, like np.add.at but faster."""
+    return np.stack([np.bincount(indices, values[:, i], minlength=n) for i in range(3)], axis=1)
+
+
+class PositionBasedCloth(SimulatorBackend):
+    """Reference cloth solver with position based dynamics, vectorized over all constraints with NumPy.
+
+    Stretching is resisted by distance constraints on the mesh edges and bending by distance constraints between the
+    vertices opposite of each interior edge. The constraints are projected in parallel, averaging the corrections per
+    vertex. Colliders must be horizontal planes, such as the ground. Contact keeps the cloth at least its thickness
+    above them, with Coulomb friction proportional to the penetration that was resolved. It is not accurate, but
+    simulates a fold in seconds on any CPU, which is enough to smoke test trajectories and losses.
+
+    Args:
+        fps (float): frame rate, step advances the simulation by 1 / fps seconds.
+        substeps (int): number of time steps per frame.
+        iterations (int): constraint projection iterations per substep.
+        density (float): area density of the cloth in kg/m^2.
+        stretch_stiffness (float): fraction of the stretch error that an iteration corrects, in [0, 1].
+        bend_stiffness (float): fraction of the bending error that an iteration corrects, in [0, 1].
+        damping (float): fraction of the velocity that is lost every substep.
+        gravity (np.ndarray): gravitational acceleration.
+    """
+
+    def __init__(
+        self,
+        fps=25,
+        substeps=10,
+        iterations=10,
+        density=0.2,
+        stretch_stiffness=1.0,
+        bend_stiffness=0.05,
+        damping=0.01,
+        gravity=GRAVITY,
+    ):
+        super().__init__(fps)
+        self.substeps = substeps
+        self.iterations = iterations
+        self.density = density
+        self.stretch_stiffness = stretch_stiffness
+        self.bend_stiffness = bend_stiffness
+        self.damping = damping
+        self.gravity = np.asarray(gravity, dtype=np.float64)
+        self.colliders = []
+        self.x = None
+
+    def add_cloth(self, vertices, triangles, material=None):
+        if self.x is not None:
+            raise ValueError("PositionBasedCloth simulates a single cloth.")
+
+        self.x = np.array(vertices, dtype=np.float64)
+        self.v = np.zeros_like(self.x)
+        self.triangles = np.asarray(triangles)
+        self.thickness = 0.001 if material is None else material.thickness
+        # Vertices without area, e.g. of degenerate triangles, get the mass of the lightest other vertex.
+        areas = vertex_areas(self.x, self.triangles)
+        positive_areas = areas[areas > 0.0]
+        min_area = positive_areas.min() if len(positive_areas) else 1.0
+        self.inverse_masses = 1.0 / (self.density * np.maximum(areas, min_area))
+
+        edges = unique_edges(self.triangles)
+        bends = bending_pairs(self.triangles)
+        self.constraints = np.concatenate([edges, bends])
+        self.rest_lengths = np.linalg.norm(self.x[self.constraints[:, 1]] - self.x[self.constraints[:, 0]], axis=1)
+        self.stiffnesses = np.concatenate(
+            [np.full(len(edges), self.stretch_stiffness), np.full(len(bends), self.bend_stiffness)]
+        )
+        self.constraint_counts = np.maximum(np.bincount(self.constraints.ravel(), minlength=len(self.x)), 1)
+
+    def add_collider(self, vertices, triangles=None, friction_coefficient=0.8):
+        heights = np.asarray(vertices)[:, 2]
+        if np.ptp(heights) > 1e-6:
+            raise ValueError("PositionBasedCloth only supports horizontal planes as colliders.")
+        self.colliders.append((heights.max(), friction_coefficient))
+
+    def _project_constraints(self, p, inverse_masses):
+        i, j = self.constraints.T
+        d = p[j] - p[i]
+        lengths = np.maximum(np.linalg.norm(d, axis=1), 1e-12)
+        w = inverse_masses[i] + inverse_masses[j]
+        errors = self.stiffnesses * (lengths - self.rest_lengths)
+        scale = np.divide(errors, w * lengths, out=np.zeros_like(w), where=w > 0)
+        corrections = scale[:, np.newaxis] * d
+
+        # Both endpoints move towards each other, weighted by their inverse mass.
+        n = len(p)
+        delta = scatter_add(n, i, inverse_masses[i, np.newaxis] * corrections)
+        delta -= scatter_add(n, j, inverse_masses[j, np.newaxis] * corrections)
+        p += delta / self.constraint_counts[:, np.newaxis]
+
+    def _resolve_contacts(self, p, x, inverse_masses):
+        for height, friction_coefficient in self.colliders:
+            penetration = height + self.thickness - p[:, 2]
+            contact = (penetration > 0.0) & (inverse_masses > 0.0)
+            p[contact, 2] += penetration[contact]
+
+            # Coulomb friction: cancel the sliding of this substep up to the friction cone.
+            sliding = p[contact, :2] - x[contact, :2]
+            distance = np.maximum(np.linalg.norm(sliding, axis=1), 1e-12)
+            fraction = np.minimum(friction_coefficient * penetration[contact] / distance, 1.0)
+            p[contact, :2] -= fraction[:, np.newaxis] * sliding
+
+    def step(self, action=None):
+        ids, velocities = as_action(action)
+        inverse_masses = self.inverse_masses.copy()
+        inverse_masses[ids] = 0.0
+        self.v[ids] = velocities
+        free = inverse_masses > 0.0
+
+        h = 1.0 / (self.fps * self.substeps)
+        for _ in range(self.substeps):
+            self.v[free] += h * self.gravity
+            p = self.x + h * self.v
+            for _ in range(self.iterations):
+                self._project_constraints(p, inverse_masses)
+            self._resolve_contacts(p, self.x, inverse_masses)
+
+            self.v[free] = (1.0 - self.damping) * (p[free] - self.x[free]) / h
+            self.x = p
+
+    def positions(self):
+        return self.x.copy()
+
+
+class CIPCBackend(SimulatorBackend):
+    """Codim-IPC behind the backend interface, the cloth and colliders are added to Blender as mesh objects.
+
+    Args:
+        filepaths (dict): output paths of the run, see cipc.dirs.ensure_output_filepaths.
+        fps (float): frame rate, step advances the simulation by 1 / fps seconds.
+        friction_coefficient (float): friction of the cloth, the C-IPC default when None.
+    """
+
+    def __init__(self, filepaths, fps=25, friction_coefficient=None):
+        from cipc.simulator import SimulationCIPC
+
+        super().__init__(fps)
+        self.simulation = SimulationCIPC(filepaths, fps)
+        if friction_coefficient is not None:
+            self.simulation.friction_coefficient = friction_coefficient
+        self.cloth = None
+        self.initialized = False
+
+    def add_cloth(self, vertices, triangles, material=None):
+        from cloth_manipulation.mesh import make_mesh_object
+
+        self.cloth = make_mesh_object("Cloth", vertices, triangles)
+        self.simulation.add_cloth(self.cloth, material)
+
+    def add_collider(self, vertices, triangles, friction_coefficient=0.8):
+        from cloth_manipulation.mesh import make_mesh_object
+
+        collider = make_mesh_object("Collider", vertices, triangles)
+        self.simulation.add_collider(collider, friction_coefficient=friction_coefficient)
+
+    def initialize(self):
+        if not self.initialized:
+            self.simulation.initialize_cipc()
+            self.initialized = True
+
+    def step(self, action=None):
+        self.initialize()
+        self.simulation.step(action_as_dict(*as_action(action)))
+
+    def positions(self):
+        from cloth_manipulation.mesh import get_world_vertex_coordinates
+
+        self.initialize()
+        frame_objects = self.simulation.blender_objects_output.get(self.cloth.name)
+        if not frame_objects:  # No frame has been simulated yet.
+            return get_world_vertex_coordinates(self.cloth)
+        return get_world_vertex_coordinates(frame_objects[max(frame_objects)])
+
+
+def simulate_grippers(backend, grippers, triangles, start_frame, end_frame):
+    """Run a backend from start_frame to end_frame with the actions of TrajectoryGrippers.
+
+    Returns:
+        np.ndarray: (T, N, 3) cloth positions of all frames, including start_frame.
+    """
+    backend.initialize()
+    frames = [backend.positions()]
+    for frame in range(start_frame, end_frame):
+        action = merge_actions(gripper.velocities(frame, frames[-1], triangles) for gripper in grippers)
+        backend.step(action)
+        frames.append(backend.positions())
+    return np.stack(frames)
@@ -0,0 +1,246 @@
+"""Local parameter sweeps over the fold experiments, without the wandb service."""
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+
+
+def height_ratio_tilt_angle_grid(height_ratios=None, angle_start=30.0, angle_end=90.0, angles_per_height_ratio=18):
+    """The height_ratio x tilt_angle grid of the *_init_sweep.py scripts as a list of parameter dicts.
+
+    Higher trajectories get more angles, at least 2, and the tilt angle is measured from the vertical.
+    """
+    if height_ratios is None:
+        height_ratios = np.linspace(0.1, 1.0, 14)
+
+    grid = []
+    for height_ratio in height_ratios:
+        n_angles = max(2, int(angles_per_height_ratio * height_ratio))
+        for angle in np.linspace(angle_start, angle_end, n_angles):
+            grid.append({"height_ratio": float(height_ratio), "tilt_angle": float(90.0 - angle)})
+    return grid
+
+
+def run_dir_name(params):
+    return f"height_ratio {params['height_ratio']:.4f} tilt_angle {params['tilt_angle']}"
+
+
+def run_blender_job(script, params, run_dir, blender="blender", threads=1, extra_args=()):
+    """Run one sweep point as a `blender -b` process and return its parameters merged with its losses."""
+    os.makedirs(run_dir, exist_ok=True)
+    command = [blender, "-b", "-t", str(threads), "-P", script, "--"]
+    command += ["-ht", str(params["height_ratio"]), "-ta", str(params["tilt_angle"]), "-d", run_dir, *extra_args]
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+
+    with open(os.path.join(run_dir, "losses.json")) as f:
+        losses = json.load(f)
+    return {**params, **losses, "run_dir": run_dir}
+
+
+def point_key(params, decimals=6):
+    """Key of a sweep point: its parameters rounded to a fixed number of decimals, so float noise is ignored."""
+    return ";".join(f"{name}={round(float(value) * 10**decimals)}" for name, value in sorted(params.items()))
+
+
+def this_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_is_alive(owner):
+    """Whether the launcher that made a claim still runs, unknown (assumed alive) for other hosts."""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class ResultStore:
+    """SQLite store of sweep results, indexed on the quantized parameters of each point.
+
+    A point is claimed before it runs. Claiming is a single atomic insert, so several launchers that share a store
+    never run the same point, and finished points are found with one primary key lookup instead of a scan. Each claim
+    records its owner as host:pid and the time it was made. A claim is stale, and can be taken over, when its owner
+    process no longer runs on this host or when it is older than lease seconds.
+
+    Args:
+        path (str): path of the SQLite file.
+        decimals (int): precision of the parameters in the point keys.
+        lease (float): seconds after which claims of other hosts expire, None to never expire them.
+    """
+
+    def __init__(self, path, decimals=6, lease=None):
+        self.decimals = decimals
+        self.lease = lease
+        self.connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS points "
+            "(key TEXT PRIMARY KEY, params TEXT, status TEXT, owner TEXT, result TEXT, claimed_at REAL)"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(points)")]
+        if "claimed_at" not in columns:  # Stores made before claims had a time.
+            self.connection.execute("ALTER TABLE points ADD COLUMN claimed_at REAL")
+
+    def key(self, params):
+        return point_key(params, self.decimals)
+
+    def claim(self, params, owner=None):
+        """Mark a point as running, returns False if it is done or claimed by a launcher that is still running."""
+        if owner is None:
+            owner = this_owner()
+        key = self.key(params)
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO points VALUES (?, ?, 'running', ?, NULL, ?)",
+            (key, json.dumps(params), owner, time.time()),
+        )
+        if cursor.rowcount == 1:
+            return True
+
+        row = self.connection.execute("SELECT status, owner, claimed_at FROM points WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] != "running" or not self.is_stale(row[1], row[2]):
+            return False
+
+        # Take the stale claim over, unless another launcher just did.
+        cursor = self.connection.execute(
+            "UPDATE points SET owner = ?, claimed_at = ? WHERE key = ? AND status = 'running' AND owner = ?",
+            (owner, time.time(), key, row[1]),
+        )
+        return cursor.rowcount == 1
+
+    def is_stale(self, owner, claimed_at):
+        if owner is None or not owner_is_alive(owner):
+            return True
+        return self.lease is not None and (claimed_at is None or time.time() - claimed_at > self.lease)
+
+    def complete(self, params, result):
+        self.connection.execute(
+            "UPDATE points SET status = 'done', result = ? WHERE key = ?", (json.dumps(result), self.key(params))
+        )
+
+    def release(self, params):
+        """Remove the claim on a point that did not finish, so it will be run again."""
+        self.connection.execute("DELETE FROM points WHERE key = ? AND status = 'running'", (self.key(params),))
+
+    def release_owner(self, owner=None):
+        """Remove all claims of unfinished points of one owner, this process by default."""
+        if owner is None:
+            owner = this_owner()
+        self.connection.execute("DELETE FROM points WHERE status = 'running' AND owner = ?", (owner,))
+
+    def is_done(self, params):
+        row = self.connection.execute("SELECT status FROM points WHERE key = ?", (self.key(params),)).fetchone()
+        return row is not None and row[0] == "done"
+
+    def results(self):
+        rows = self.connection.execute("SELECT result FROM points WHERE status = 'done'")
+        return [json.loads(result) for (result,) in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+def run_sweep(
+    script,
+    grid,
+    output_dir,
+    cores_per_run=1,
+    max_workers=None,
+    blender="blender",
+    extra_args=(),
+    lease=None,
+):
+    """Run all unfinished points of a grid in parallel and store their results in output_dir/results.sqlite.
+
+    Points that are already done or claimed by another running launcher sharing output_dir are skipped. A point is
+    only claimed when it is submitted, and the claims of points that did not finish are released when the sweep
+    stops, also when it is interrupted. Claims left by a launcher that was killed are taken over, see ResultStore.
+
+    Args:
+        script (str): path to the experiment script, it must accept the -ht, -ta and -d arguments.
+        grid (list): parameter dicts, see height_ratio_tilt_angle_grid.
+        output_dir (str): directory for the run directories and the result store.
+        cores_per_run (int): cores given to each Blender process, also passed as its thread count.
+        max_workers (int): concurrent runs, by default as many as fit in the cores of this machine.
+        blender (str): the Blender executable.
+        extra_args (tuple): extra command line arguments for the script, e.g. ("-cm", "0").
+        lease (float): seconds after which claims of launchers on other hosts expire.
+
+    Returns:
+        list: the result dicts of the runs that succeeded, in order of completion.
+    """
+    if max_workers is None:
+        max_workers = max(1, os.cpu_count() // cores_per_run)
+
+    script = os.path.abspath(script)
+    os.makedirs(output_dir, exist_ok=True)
+    store = ResultStore(os.path.join(output_dir, "results.sqlite"), lease=lease)
+
+    results = []
+    futures = {}
+    n_submitted = 0
+
+    def collect(done):
+        for future in done:
+            params = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:  # Also e.g. a corrupt losses.json, one failed run should not stop the sweep.
+                print(f"Run {params} failed: {e!r}")
+                store.release(params)
+                continue
+
+            store.complete(params, result)
+            results.append(result)
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        for params in grid:
+            if len(futures) >= max_workers:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+            if not store.claim(params):
+                continue
+            run_dir = os.path.join(output_dir, run_dir_name(params))
+            future = executor.submit(run_blender_job, script, params, run_dir, blender, cores_per_run, extra_args)
+            futures[future] = params
+            n_submitted += 1
+
+        collect(as_completed(list(futures)))
+        print(f"Ran {n_submitted} of {len(grid)} points, {len(results)} succeeded.")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        store.release_owner()
+        store.close()
+
+    return results
+
+
+def load_results(store_path):
+    store = ResultStore(store_path)
+    results = store.results()
+    store.close()
+    return results
+
+
+def mirror_to_wandb(store_path, project, entity=None, tags=("local",)):
+    """Log every result of a local sweep as a wandb run, with its result image and thumbnail if they were rendered."""
+    import wandb
+
+    for result in load_results(store_path):
+        config = {"height_ratio": result["height_ratio"], "tilt_angle": result["tilt_angle"]}
+        with wandb.init(project=project, entity=entity, config=config, tags=list(tags), reinit=True):
+            wandb.log({key: value for key, value in result.items() if key != "run_dir"})
+            for image_name in ("result", "thumbnail"):
+                image_path = os.path.join(result["run_dir"], f"{image_name}.png")
+                if os.path.exists(image_path):
+                    wandb.log({image_name: wandb.Image(image_path)})
@@ -0,0 +1,208 @@
+"""Persistent Blender worker processes for running many experiment runs without restarting Blender."""
+import concurrent.futures
+import importlib.util
+import json
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+
+
+class BlenderWorkerPool:
+    """Pool of long-lived Blender processes that run an experiment function for many parameter sets.
+
+    Each worker imports the experiment script once, calls its setup function (if the script defines one) and saves
+    the resulting scene as its baseline. Before every following job the scene is reset to that baseline, so Blender
+    startup and the setup are paid once per worker instead of once per run. Jobs are keyword arguments for the
+    experiment function, sent as JSON over a local socket. The return values come back as JSON.
+
+    Args:
+        script (str): path to the experiment script.
+        function (str): name of the function in the script to call for each job.
+        n_workers (int): number of Blender processes.
+        setup (str): name of the function in the script to call once when a worker starts.
+        blender (str): the Blender executable.
+        startup_timeout (float): seconds to wait for all workers to finish their setup and connect.
+    """
+
+    def __init__(self, script, function, n_workers=1, setup="setup", blender="blender", startup_timeout=600):
+        authkey = secrets.token_bytes(16)
+        self.listener = Listener(("localhost", 0), authkey=authkey)
+        host, port = self.listener.address
+
+        command = [blender, "-b", "-P", os.path.abspath(__file__), "--", os.path.abspath(script), function, setup]
+        command += [host, str(port), authkey.hex()]
+        self.processes = [subprocess.Popen(command, stdout=subprocess.DEVNULL) for _ in range(n_workers)]
+
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.n_alive = 0
+        self.threads = []
+        for connection in self._accept_workers(n_workers, startup_timeout):
+            thread = threading.Thread(target=self._dispatch, args=(connection,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+            self.n_alive += 1
+
+    def _accept_workers(self, n_workers, timeout):
+        """Accept a connection from every worker, failing if a worker exits or the timeout passes first."""
+        connections = queue.Queue()
+
+        def accept():
+            for _ in range(n_workers):
+                try:
+                    connections.put(self.listener.accept())
+                except OSError:  # The listener was closed because starting the pool failed.
+                    return
+
+        threading.Thread(target=accept, daemon=True).start()
+
+        accepted = []
+        deadline = time.monotonic() + timeout
+        while len(accepted) < n_workers:
+            try:
+                accepted.append(connections.get(timeout=0.5))
+                continue
+            except queue.Empty:
+                pass
+
+            exited = [process for process in self.processes if process.poll() is not None]
+            if exited or time.monotonic() > deadline:
+                for connection in accepted:
+                    connection.close()
+                self._terminate()
+                if exited:
+                    raise RuntimeError(f"A Blender worker exited with code {exited[0].returncode} during setup.")
+                raise TimeoutError(f"Blender workers did not connect within {timeout} seconds.")
+        return accepted
+
+    def _terminate(self):
+        for process in self.processes:
+            process.kill()
+            process.wait()
+        self.listener.close()
+
+    def _worker_lost(self):
+        """Fail the queued jobs once no worker is left to run them."""
+        with self.lock:
+            self.n_alive -= 1
+            if self.n_alive > 0:
+                return
+
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                future, kwargs = job
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(RuntimeError(f"All Blender workers exited before job {kwargs}."))
+
+    def _dispatch(self, connection):
+        with connection:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    connection.send_bytes(json.dumps(None).encode())
+                    return
+
+                future, kwargs = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    connection.send_bytes(json.dumps(kwargs).encode())
+                    reply = json.loads(connection.recv_bytes())
+                except (EOFError, OSError):
+                    future.set_exception(RuntimeError(f"Blender worker exited during job {kwargs}."))
+                    self._worker_lost()
+                    return
+
+                if reply["error"] is not None:
+                    future.set_exception(RuntimeError(reply["error"]))
+                else:
+                    future.set_result(reply["result"])
+
+    def submit(self, **kwargs):
+        """Queue a job and return a concurrent.futures.Future for the return value of the experiment function."""
+        future = concurrent.futures.Future()
+        with self.lock:
+            if self.n_alive == 0:
+                future.set_exception(RuntimeError("All Blender workers have exited."))
+                return future
+            self.jobs.put((future, kwargs))
+        return future
+
+    def map(self, jobs):
+        """Run a list of jobs (dicts of keyword arguments) and return their results in the same order."""
+        futures = [self.submit(**kwargs) for kwargs in jobs]
+        return [future.result() for future in futures]
+
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        for process in self.processes:
+            process.wait()
+        self.listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_script(script):
+    sys.path.insert(0, os.path.dirname(script))
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(script))[0], script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def serve(script, function, setup, host, port, authkey):
+    """Worker loop that runs inside Blender, see BlenderWorkerPool.
+
+    The pool starts each worker as `blender -b -P workers.py -- <script> <function> <setup> <host> <port> <authkey>`.
+    """
+    import bpy
+
+    experiment = load_script(script)
+    if hasattr(experiment, setup):
+        getattr(experiment, setup)()
+    experiment_function = getattr(experiment, function)
+
+    baseline_path = os.path.join(tempfile.mkdtemp(), "baseline.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=baseline_path, copy=True)
+
+    with Client((host, int(port)), authkey=bytes.fromhex(authkey)) as connection:
+        scene_is_clean = True
+        while True:
+            kwargs = json.loads(connection.recv_bytes())
+            if kwargs is None:
+                break
+
+            if not scene_is_clean:
+                bpy.ops.wm.open_mainfile(filepath=baseline_path)
+            scene_is_clean = False
+
+            try:
+                result, error = experiment_function(**kwargs), None
+            except Exception:
+                result, error = None, traceback.format_exc()
+
+            connection.send_bytes(json.dumps({"result": result, "error": error}, default=float).encode())
+
+
+if __name__ == "__main__":
+    arg_start = sys.argv.index("--") + 1
+    serve(*sys.argv[arg_start:])
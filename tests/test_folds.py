@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from cloth_manipulation.folds import (
+    BezierFoldTrajectory,
+    BezierFoldTrajectoryBatch,
+    EllipticalFoldTrajectory,
+    FoldSequence,
+    SleeveFold,
+)
+from cloth_manipulation.geometry import fold_vertices
+
+KEYPOINTS = {
+    "armpit_left": [-0.15, 0.1, 0.0],
+    "armpit_right": [0.15, 0.1, 0.0],
+    "bottom_left": [-0.15, -0.3, 0.0],
+    "bottom_right": [0.15, -0.3, 0.0],
+    "shoulder_left": [-0.12, 0.25, 0.0],
+    "shoulder_right": [0.12, 0.25, 0.0],
+    "sleeve_top_left": [-0.35, 0.2, 0.0],
+    "sleeve_top_right": [0.35, 0.2, 0.0],
+    "sleeve_bottom_left": [-0.3, 0.05, 0.0],
+    "sleeve_bottom_right": [0.3, 0.05, 0.0],
+}
+
+
+def test_fold_geometry_is_cached_and_read_only():
+    fold = SleeveFold(KEYPOINTS, "left")
+
+    point_on_line, line_direction = fold.fold_line()
+
+    assert fold.fold_line()[1] is line_direction
+    assert fold.gripper_start_pose() is fold.gripper_start_pose()
+    with pytest.raises(ValueError):
+        line_direction[0] = 0.0
+
+
+def test_fold_cache_accepts_keyword_arguments():
+    fold = SleeveFold(KEYPOINTS, "left")
+
+    end_pose = fold.gripper_end_pose(end_angle=170)
+    assert fold.gripper_end_pose() is end_pose
+    assert fold.gripper_end_pose(170) is end_pose
+    assert not np.allclose(fold.gripper_end_pose(end_angle=90), end_pose)
+
+
+def test_fold_cache_is_cleared_by_changes():
+    fold = SleeveFold(KEYPOINTS, "left")
+    left_line = fold.fold_line()
+
+    fold.side = "right"
+    right_line = fold.fold_line()
+    assert not np.allclose(left_line[0], right_line[0])
+    assert np.allclose(right_line[0], KEYPOINTS["armpit_right"])
+
+    fold.keypoints = {**KEYPOINTS, "armpit_right": [0.2, 0.1, 0.0]}
+    assert np.allclose(fold.fold_line()[0], [0.2, 0.1, 0.0])
+
+
+def test_fold_sequence_matches_folding_one_by_one():
+    rng = np.random.default_rng(0)
+    vertices = np.concatenate([rng.uniform(-0.4, 0.4, (300, 2)), np.zeros((300, 1))], axis=1)
+    folds = [SleeveFold(KEYPOINTS, "left"), SleeveFold(KEYPOINTS, "right")]
+    sequence = FoldSequence([(folds[0], 0.001), (folds[1], 0.002)])
+
+    folded, layer_offsets = sequence.fold_vertices(vertices, return_layer_offsets=True)
+
+    expected = vertices.copy()
+    for fold, thickness in sequence.steps:
+        expected = fold_vertices(expected, *fold.fold_line(), cloth_thickness=thickness)
+    assert np.allclose(folded, expected)
+    assert np.allclose(folded[:, 2], layer_offsets)
+    assert np.array_equal(vertices[:, 2], np.zeros(300))
+
+
+@pytest.mark.parametrize(
+    "trajectory",
+    [
+        EllipticalFoldTrajectory(SleeveFold(KEYPOINTS, "left"), scale=0.7, tilt_angle=15),
+        BezierFoldTrajectory(SleeveFold(KEYPOINTS, "right"), height_ratio=0.6, tilt_angle=-20),
+    ],
+)
+def test_trajectory_poses_match_pose(trajectory):
+    ts = np.linspace(0.0, 1.0, 11)
+    positions, orientations = trajectory.poses(ts)
+    transforms = trajectory.transforms(ts)
+
+    for i, t in enumerate(ts):
+        pose = np.array(trajectory.pose(t))
+        assert np.allclose(pose[:3, 3], positions[i])
+        assert np.allclose(pose[:3, :3], orientations[i])
+        assert np.allclose(pose, transforms[i])
+
+
+@pytest.mark.parametrize("end_angle, scale, tilt_angle", [(160, 1.0, 0), (160, 1.0, 30), (180, 0.5, 20)])
+def test_elliptical_trajectory_ends_at_fold_end_pose(end_angle, scale, tilt_angle):
+    fold = SleeveFold(KEYPOINTS, "left")
+    trajectory = EllipticalFoldTrajectory(fold, end_angle=end_angle, scale=scale, tilt_angle=tilt_angle)
+
+    assert np.allclose(np.array(trajectory.start), np.array(fold.gripper_start_pose()))
+    assert np.allclose(np.array(trajectory.end), fold.gripper_end_pose(end_angle))
+    assert np.allclose(trajectory.positions(1.0)[0], np.array(trajectory.end)[:3, 3])
+
+
+def test_bezier_batch_matches_single_trajectories():
+    fold = SleeveFold(KEYPOINTS, "left")
+    height_ratios = np.array([0.2, 0.6, 1.0])
+    tilt_angles = np.array([-30.0, 0.0, 45.0])
+    end_heights = np.array([0.05, 0.1, 0.0])
+    batch = BezierFoldTrajectoryBatch(fold, height_ratios, tilt_angles, end_heights)
+    ts = np.linspace(0.0, 1.0, 11)
+
+    positions = batch.positions(ts)
+    batch_positions, batch_orientations = batch.poses(ts)
+    assert len(batch) == 3 and positions.shape == (3, 11, 3)
+    for g in range(len(batch)):
+        trajectory = BezierFoldTrajectory(fold, height_ratios[g], tilt_angles[g], end_heights[g])
+        single_positions, single_orientations = trajectory.poses(ts)
+        assert np.allclose(positions[g], single_positions)
+        assert np.allclose(batch_positions[g], single_positions)
+        assert np.allclose(batch_orientations, single_orientations)
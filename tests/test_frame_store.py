@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from cloth_manipulation.frame_store import FrameStore, FrameStoreWriter
+
+TRIANGLES = np.array([[0, 1, 2], [1, 3, 2]])
+
+
+def write_frames(path, n_frames, **kwargs):
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(n_frames, 4, 3)).astype(np.float32)
+    velocities = rng.normal(size=(n_frames, 4, 3)).astype(np.float32)
+    with FrameStoreWriter(path, TRIANGLES, 4, velocities=True, metadata={"fps": 25}, **kwargs) as writer:
+        for frame_positions, frame_velocities in zip(positions, velocities):
+            writer.append(frame_positions, frame_velocities)
+    return positions, velocities
+
+
+@pytest.mark.parametrize("kwargs", [{"max_frames": 10}, {"compress": True, "chunk_size": 3}])
+def test_round_trip(tmp_path, kwargs):
+    positions, velocities = write_frames(str(tmp_path), 7, **kwargs)
+
+    store = FrameStore(str(tmp_path))
+
+    assert len(store) == 7
+    assert store.metadata == {"fps": 25}
+    assert np.array_equal(store.triangles, TRIANGLES)
+    assert np.array_equal(store.all_positions(), positions)
+    assert np.array_equal(store[-1], positions[-1])
+    assert np.array_equal(store.velocities(4), velocities[4])
+    with pytest.raises(IndexError):
+        store.positions(7)
+
+
+def test_full_store_raises(tmp_path):
+    writer = FrameStoreWriter(str(tmp_path), TRIANGLES, 4, max_frames=1)
+    writer.append(np.zeros((4, 3)))
+    with pytest.raises(ValueError):
+        writer.append(np.zeros((4, 3)))
+
+
+def test_failed_write_is_not_readable(tmp_path):
+    with pytest.raises(RuntimeError):
+        with FrameStoreWriter(str(tmp_path), TRIANGLES, 4, max_frames=2) as writer:
+            writer.append(np.zeros((4, 3)))
+            raise RuntimeError("The simulation failed.")
+
+    with pytest.raises(FileNotFoundError):
+        FrameStore(str(tmp_path))
@@ -0,0 +1,57 @@
+import numpy as np
+
+from cloth_manipulation.geometry import fold_frame, fold_vertices, reflect_vertices
+
+
+def reflect_brute_force(vertices, frame):
+    """Reflect every vertex with a full change of basis to the fold frame and back."""
+    frame_inv = np.linalg.inv(frame)
+    reflected = []
+    for vertex in vertices:
+        local = frame_inv @ np.append(vertex, 1.0)
+        if local[1] >= 0.0:
+            local[1] = -local[1]
+        reflected.append((frame @ local)[:3])
+    return np.array(reflected)
+
+
+def test_reflect_vertices_matches_change_of_basis():
+    rng = np.random.default_rng(0)
+    vertices = rng.uniform(-1.0, 1.0, (200, 3))
+    line_direction = np.array([np.cos(0.3), np.sin(0.3), 0.0])
+    frame = fold_frame(np.array([0.1, -0.2, 0.0]), line_direction)
+
+    reflected, mask = reflect_vertices(vertices, frame)
+
+    assert np.allclose(reflected, reflect_brute_force(vertices, frame))
+    assert np.array_equal(reflected[~mask], vertices[~mask])
+
+
+def test_reflect_vertices_in_place():
+    vertices = np.array([[0.0, 1.0, 0.0], [0.0, -1.0, 0.0]])
+    frame = fold_frame(np.zeros(3), np.array([1.0, 0.0, 0.0]))
+
+    out, mask = reflect_vertices(vertices, frame, out=vertices)
+
+    assert out is vertices
+    assert np.allclose(vertices, [[0.0, -1.0, 0.0], [0.0, -1.0, 0.0]])
+    assert np.array_equal(mask, [True, False])
+
+
+def test_fold_vertices_lifts_folded_side():
+    vertices = np.array([[0.5, 0.2, 0.0], [0.5, -0.2, 0.0]])
+
+    folded = fold_vertices(vertices, np.zeros(3), np.array([1.0, 0.0, 0.0]), cloth_thickness=0.01)
+
+    assert np.allclose(folded, [[0.5, -0.2, 0.01], [0.5, -0.2, 0.0]])
+    assert np.allclose(vertices, [[0.5, 0.2, 0.0], [0.5, -0.2, 0.0]])
+
+
+def test_fold_vertices_in_place_over_diagonal():
+    vertices = np.array([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0]])
+    line_direction = np.array([1.0, 1.0, 0.0]) / np.sqrt(2.0)
+
+    out = fold_vertices(vertices, np.zeros(3), line_direction, cloth_thickness=0.0, out=vertices)
+
+    assert out is vertices
+    assert np.allclose(vertices, [[1.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from cloth_manipulation.grasp import GraspIndex
+
+
+def brute_force_grasped_vertices(vertices, faces, box_min, box_max):
+    grasped = set()
+    for face in faces:
+        face_vertices = vertices[face]
+        if np.all(face_vertices.min(axis=0) <= box_max) and np.all(box_min <= face_vertices.max(axis=0)):
+            grasped.update(face.tolist())
+    return sorted(grasped)
+
+
+@pytest.fixture
+def cloth():
+    rng = np.random.default_rng(0)
+    vertices = rng.uniform(0.0, 1.0, (400, 3)) * [1.0, 1.0, 0.1]
+    faces = rng.integers(0, len(vertices), (600, 3))
+    return vertices, faces
+
+
+@pytest.fixture
+def boxes():
+    rng = np.random.default_rng(1)
+    centers = rng.uniform(-0.1, 1.1, (20, 3))
+    return centers - 0.05, centers + 0.05
+
+
+@pytest.mark.parametrize("cell_size", [None, 0.03, 0.1, 1.0])
+def test_grasped_vertices_match_brute_force(cloth, boxes, cell_size):
+    vertices, faces = cloth
+    index = GraspIndex(vertices, faces, cell_size)
+
+    for box_min, box_max in zip(*boxes):
+        expected = brute_force_grasped_vertices(vertices, faces, box_min, box_max)
+        assert index.grasped_vertices(box_min, box_max).tolist() == expected
+
+
+@pytest.mark.parametrize("cell_size", [None, 0.1])
+def test_grasped_vertices_batch(cloth, boxes, cell_size):
+    vertices, faces = cloth
+    index = GraspIndex(vertices, faces, cell_size)
+
+    batch = index.grasped_vertices_batch(*boxes)
+
+    for grasped, box_min, box_max in zip(batch, *boxes):
+        assert grasped.tolist() == brute_force_grasped_vertices(vertices, faces, box_min, box_max)
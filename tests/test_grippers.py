@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from cloth_manipulation.geometry import pose_matrices, rotation_matrices
+from cloth_manipulation.grasp import rigid_motion, transform_points
+from cloth_manipulation.grippers import action_ranges, id_ranges, merge_actions
+
+
+def test_id_ranges():
+    starts, ends = id_ranges([9, 3, 4, 10, 5, 3, 12])
+    assert np.array_equal(starts, [3, 9, 12])
+    assert np.array_equal(ends, [6, 11, 13])
+
+    starts, ends = id_ranges([])
+    assert len(starts) == len(ends) == 0
+
+
+def test_action_ranges_split_on_gaps_and_velocities():
+    ids = np.array([2, 0, 1, 5, 6, 7])
+    velocities = np.array([[1.0, 0, 0], [1.0, 0, 0], [1.0, 0, 0], [0, 2.0, 0], [0, 3.0, 0], [0, 3.0, 0]])
+
+    starts, ends, range_velocities = action_ranges(ids, velocities)
+
+    assert np.array_equal(starts, [0, 5, 6])
+    assert np.array_equal(ends, [3, 6, 8])
+    assert np.array_equal(range_velocities, [[1.0, 0, 0], [0, 2.0, 0], [0, 3.0, 0]])
+    assert len(action_ranges(np.empty(0, dtype=np.int64), np.empty((0, 3)))[0]) == 0
+
+
+def test_merge_actions_later_actions_override():
+    first = np.array([0, 1, 2]), np.full((3, 3), 1.0)
+    second = np.array([2, 3]), np.full((2, 3), 2.0)
+
+    ids, velocities = merge_actions([first, second])
+
+    order = np.argsort(ids)
+    assert np.array_equal(ids[order], [0, 1, 2, 3])
+    assert np.array_equal(velocities[order, 0], [1.0, 1.0, 2.0, 2.0])
+    assert velocities.flags.c_contiguous
+    assert len(merge_actions([])[0]) == 0
+
+
+@pytest.mark.parametrize("angle", [0.0, 0.3, 3.0])
+def test_rigid_motion_reproduces_next_transform(angle):
+    rng = np.random.default_rng(0)
+    dt = 0.04
+    transform = pose_matrices([0.1, -0.2, 0.3], rotation_matrices(np.array([0.0, 0.6, 0.8]), 0.5))
+    axis = np.array([1.0, 2.0, 2.0]) / 3.0
+    next_orientation = rotation_matrices(axis, angle) @ transform[:3, :3]
+    next_transform = pose_matrices([0.15, -0.1, 0.35], next_orientation)
+
+    velocity, center, motion_axis, angular_velocity = rigid_motion(transform, next_transform, dt)
+
+    assert np.isclose(np.linalg.norm(motion_axis), 1.0)
+    assert np.isclose(angular_velocity * dt, angle)
+    points = rng.normal(size=(20, 3))
+    rotation = rotation_matrices(motion_axis, angular_velocity * dt)
+    moved = (points - center) @ rotation.T + center + velocity * dt
+    expected = transform_points(next_transform @ np.linalg.inv(transform), points)
+    assert np.allclose(moved, expected)
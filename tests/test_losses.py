@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from cloth_manipulation.losses import (
+    NearestNeighbourIndex,
+    batch_mean_distance,
+    batch_root_mean_squared_distance,
+    chamfer_distance,
+    hausdorff_distance,
+    mean_distance,
+    root_mean_squared_distance,
+)
+
+
+@pytest.fixture
+def positions():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(50, 3)), rng.normal(size=(50, 3))
+
+
+def brute_force_nearest_distances(positions, target):
+    return np.array([min(np.linalg.norm(p - q) for q in target) for p in positions])
+
+
+def test_mean_distances(positions):
+    a, b = positions
+    distances = [np.linalg.norm(p - q) for p, q in zip(a, b)]
+
+    assert np.isclose(mean_distance(a, b), np.mean(distances))
+    assert np.isclose(root_mean_squared_distance(a, b), np.sqrt(np.mean(np.square(distances))))
+
+
+def test_batch_losses_match_single_losses(positions):
+    a, b = (p.astype(np.float32) for p in positions)
+    batch = np.stack([a, b, a + 1.0])
+
+    losses = batch_mean_distance(batch, b)
+
+    assert losses.dtype == np.float32
+    assert np.allclose(losses, [mean_distance(candidate, b) for candidate in batch], rtol=1e-5)
+    expected = [root_mean_squared_distance(candidate, b) for candidate in batch]
+    assert np.allclose(batch_root_mean_squared_distance(batch, b), expected, rtol=1e-5)
+
+
+def test_chamfer_and_hausdorff_match_brute_force(positions):
+    a, b = positions[0], positions[1][:30]
+    a_to_b = brute_force_nearest_distances(a, b)
+    b_to_a = brute_force_nearest_distances(b, a)
+
+    assert np.isclose(chamfer_distance(a, b), 0.5 * (a_to_b.mean() + b_to_a.mean()))
+    assert np.isclose(chamfer_distance(a, NearestNeighbourIndex(b)), chamfer_distance(a, b))
+    assert np.isclose(hausdorff_distance(a, b), max(a_to_b.max(), b_to_a.max()))
@@ -0,0 +1,43 @@
+import numpy as np
+
+from cloth_manipulation.mesh import get_vertex_coordinates, set_vertex_coordinates
+
+
+class FakeVertices:
+    """The foreach_get and foreach_set of bpy.types.MeshVertices, on a flat float32 array."""
+
+    def __init__(self, coordinates):
+        self.co = np.array(coordinates, dtype=np.float32).reshape(-1)
+
+    def __len__(self):
+        return len(self.co) // 3
+
+    def foreach_get(self, attribute, out):
+        out[:] = getattr(self, attribute)
+
+    def foreach_set(self, attribute, values):
+        getattr(self, attribute)[:] = values
+
+
+class FakeMesh:
+    def __init__(self, coordinates):
+        self.vertices = FakeVertices(coordinates)
+        self.updated = False
+
+    def update(self):
+        self.updated = True
+
+
+def test_vertex_coordinates_round_trip():
+    coordinates = np.arange(12, dtype=np.float32).reshape(4, 3)
+    mesh = FakeMesh(coordinates)
+
+    read = get_vertex_coordinates(mesh)
+    assert read.dtype == np.float32
+    assert np.array_equal(read, coordinates)
+
+    set_vertex_coordinates(mesh, 2.0 * coordinates)
+    assert mesh.updated
+    out = np.empty((4, 3), dtype=np.float32)
+    assert get_vertex_coordinates(mesh, out=out) is out
+    assert np.array_equal(out, 2.0 * coordinates)
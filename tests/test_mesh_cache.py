@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from cloth_manipulation import mesh_cache
+from cloth_manipulation.mesh_cache import CACHE_VERSION, cache_key, load_mesh, save_mesh
+
+VERTICES = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 0.0]])
+TRIANGLES = np.array([[0, 1, 2], [1, 3, 2]])
+KEYPOINT_IDS = {"shoulder_left": [np.int64(2)], "bottom_right": [1]}
+
+
+def shirt_key(**changes):
+    parameters = {"shape": {}, "minimum_triangle_density": 20000, "z_offset": 0.0, "version": CACHE_VERSION}
+    return cache_key(**{**parameters, **changes})
+
+
+def test_cache_key_depends_on_every_parameter():
+    assert shirt_key() == shirt_key()
+    assert shirt_key(shape={"a": 1.0, "b": 2.0}) == shirt_key(shape={"b": 2.0, "a": 1.0})
+
+    changed = [
+        shirt_key(shape={"sleeve_angle": 30.0}),
+        shirt_key(minimum_triangle_density=10000),
+        shirt_key(z_offset=0.01),
+        shirt_key(version=CACHE_VERSION + 1),
+    ]
+    assert len({shirt_key(), *changed}) == len(changed) + 1
+
+
+def test_save_load_round_trip(tmp_path):
+    cache_dir = str(tmp_path)
+    assert load_mesh(cache_dir, "missing") is None
+
+    save_mesh(cache_dir, "key", VERTICES, TRIANGLES, KEYPOINT_IDS)
+    vertices, triangles, keypoint_ids = load_mesh(cache_dir, "key")
+
+    assert np.array_equal(vertices, VERTICES) and vertices.dtype == np.float32
+    assert np.array_equal(triangles, TRIANGLES) and triangles.dtype == np.int32
+    assert keypoint_ids == {"shoulder_left": [2], "bottom_right": [1]}
+    assert os.listdir(cache_dir) == ["key"]  # The temporary directory was renamed.
+
+
+def test_load_is_memory_mapped_and_read_only(tmp_path):
+    save_mesh(str(tmp_path), "key", VERTICES, TRIANGLES, KEYPOINT_IDS)
+    vertices, triangles, _ = load_mesh(str(tmp_path), "key")
+
+    for array in (vertices, triangles):
+        assert isinstance(array, np.memmap)
+        with pytest.raises(ValueError):
+            array[0] = 0
+
+
+def test_existing_entry_is_kept(tmp_path):
+    save_mesh(str(tmp_path), "key", VERTICES, TRIANGLES, KEYPOINT_IDS)
+    save_mesh(str(tmp_path), "key", 2.0 * VERTICES, TRIANGLES, {})
+
+    vertices, _, keypoint_ids = load_mesh(str(tmp_path), "key")
+    assert np.array_equal(vertices, VERTICES)
+    assert keypoint_ids["shoulder_left"] == [2]
+
+
+def test_concurrent_save_keeps_first_entry(tmp_path, monkeypatch):
+    save_mesh(str(tmp_path), "key", VERTICES, TRIANGLES, KEYPOINT_IDS)
+    # Another process stores the entry between the existence check and the rename.
+    monkeypatch.setattr(mesh_cache.os.path, "exists", lambda path: False)
+    save_mesh(str(tmp_path), "key", 2.0 * VERTICES, TRIANGLES, {})
+    monkeypatch.undo()
+
+    assert os.listdir(tmp_path) == ["key"]
+    assert np.array_equal(load_mesh(str(tmp_path), "key")[0], VERTICES)
+
+
+def test_interrupted_save_leaves_no_entry(tmp_path, monkeypatch):
+    def failing_dump(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(mesh_cache.json, "dump", failing_dump)
+    with pytest.raises(KeyboardInterrupt):
+        save_mesh(str(tmp_path), "key", VERTICES, TRIANGLES, KEYPOINT_IDS)
+    monkeypatch.undo()
+
+    assert load_mesh(str(tmp_path), "key") is None
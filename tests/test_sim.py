@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from cloth_manipulation.geometry import pose_matrices
+from cloth_manipulation.grippers import TrajectoryGripper
+from cloth_manipulation.sim import PositionBasedCloth, SimulatorBackend, simulate_grippers
+
+GROUND = np.array([[-1.0, -1.0, 0.0], [1.0, -1.0, 0.0], [1.0, 1.0, 0.0], [-1.0, 1.0, 0.0]])
+GROUND_TRIANGLES = np.array([[0, 1, 2], [0, 2, 3]])
+
+
+def grid_cloth(n=10, size=0.3, height=0.05):
+    xs, ys = np.meshgrid(np.linspace(0.0, size, n), np.linspace(0.0, size, n), indexing="ij")
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.full(n * n, height)], axis=1)
+    ids = np.arange(n * n).reshape(n, n)
+    a, b, c, d = ids[:-1, :-1].ravel(), ids[1:, :-1].ravel(), ids[1:, 1:].ravel(), ids[:-1, 1:].ravel()
+    triangles = np.concatenate([np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)])
+    return vertices, triangles
+
+
+def make_solver(vertices, triangles, **kwargs):
+    solver = PositionBasedCloth(**kwargs)
+    solver.add_cloth(vertices, triangles)
+    solver.add_collider(GROUND, GROUND_TRIANGLES)
+    return solver
+
+
+class LiftTrajectory:
+    """Lift straight up by 0.1 m without rotating."""
+
+    def transforms(self, ts):
+        ts = np.atleast_1d(ts)
+        positions = np.stack([np.zeros_like(ts), np.zeros_like(ts), 0.05 + 0.1 * ts], axis=1)
+        return pose_matrices(positions, np.broadcast_to(np.identity(3), (len(ts), 3, 3)))
+
+
+def test_cloth_falls_and_rests_on_ground():
+    vertices, triangles = grid_cloth()
+    solver = make_solver(vertices, triangles)
+    for _ in range(25):
+        solver.step()
+
+    positions = solver.positions()
+    assert np.all(np.isfinite(positions))
+    assert positions[:, 2].min() >= solver.thickness - 1e-9
+    assert positions[:, 2].max() < 0.01
+
+
+def test_grasped_vertices_follow_action():
+    vertices, triangles = grid_cloth()
+    solver = make_solver(vertices, triangles)
+    velocity = np.array([[0.0, 0.0, 0.5]])
+    solver.step((np.array([0]), velocity))
+
+    assert np.allclose(solver.positions()[0], vertices[0] + velocity[0] / solver.fps)
+
+
+def test_simulate_grippers_lifts_grasped_corner():
+    vertices, triangles = grid_cloth()
+    solver = make_solver(vertices, triangles)
+    gripper = TrajectoryGripper(LiftTrajectory(), 0, 10, size=0.02)
+
+    frames = simulate_grippers(solver, [gripper], triangles, 0, 10)
+
+    assert frames.shape == (11, len(vertices), 3)
+    assert np.isclose(frames[-1, 0, 2], 0.15)
+    assert frames[-1, -1, 2] < 0.05
+
+
+def test_zero_area_vertices_have_finite_mass():
+    vertices, triangles = grid_cloth(n=4)
+    vertices = np.concatenate([vertices, [[0.5, 0.5, 0.05]]])  # Not part of any triangle.
+    solver = make_solver(vertices, triangles)
+
+    assert np.all(np.isfinite(solver.inverse_masses))
+    solver.step()
+    assert np.all(np.isfinite(solver.positions()))
+
+
+def test_tilted_collider_is_rejected():
+    solver = PositionBasedCloth()
+    tilted = GROUND + np.array([0.0, 0.0, 0.1]) * GROUND[:, :1]
+    with pytest.raises(ValueError):
+        solver.add_collider(tilted, GROUND_TRIANGLES)
+
+
+def test_simulate_grippers_initializes_backend_first():
+    class LazyBackend(SimulatorBackend):
+        def __init__(self):
+            super().__init__()
+            self.x = None
+
+        def initialize(self):
+            self.x = np.zeros((1, 3))
+
+        def add_cloth(self, vertices, triangles, material=None):
+            pass
+
+        def add_collider(self, vertices, triangles, friction_coefficient=0.8):
+            pass
+
+        def step(self, action=None):
+            self.x = self.x + 1.0
+
+        def positions(self):
+            return self.x.copy()
+
+    frames = simulate_grippers(LazyBackend(), [], np.empty((0, 3), dtype=np.int64), 0, 2)
+    assert np.array_equal(frames[:, 0, 0], [0.0, 1.0, 2.0])
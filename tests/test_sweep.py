@@ -0,0 +1,76 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from cloth_manipulation.sweep import ResultStore, height_ratio_tilt_angle_grid, point_key, this_owner
+
+PARAMS = {"height_ratio": 0.5, "tilt_angle": 20.0}
+
+
+def dead_owner():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return f"{this_owner().rpartition(':')[0]}:{process.pid}"
+
+
+def test_point_key_ignores_float_noise_and_order():
+    assert point_key(PARAMS) == point_key({"tilt_angle": 20.0 + 1e-9, "height_ratio": 0.5})
+    assert point_key(PARAMS) != point_key({"height_ratio": 0.5, "tilt_angle": 20.00001})
+    assert point_key(PARAMS, decimals=3) == point_key({"height_ratio": 0.5, "tilt_angle": 20.0001}, decimals=3)
+
+
+def test_height_ratio_tilt_angle_grid():
+    grid = height_ratio_tilt_angle_grid()
+
+    expected = []
+    for height_ratio in np.linspace(0.1, 1.0, 14):
+        for angle in np.linspace(30.0, 90.0, max(2, int(18 * height_ratio))):
+            expected.append((height_ratio, 90.0 - angle))
+    assert np.allclose([(params["height_ratio"], params["tilt_angle"]) for params in grid], expected)
+    assert len({point_key(params) for params in grid}) == len(grid)
+
+
+def test_claim_complete_and_results(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+
+    assert store.claim(PARAMS)
+    assert not store.claim(PARAMS)  # INSERT OR IGNORE keeps the first claim.
+    assert not store.claim(PARAMS, owner="other-host:1")
+    assert not store.is_done(PARAMS)
+
+    store.complete(PARAMS, {**PARAMS, "mean_distance": 0.1})
+    assert store.is_done({"height_ratio": 0.5 + 1e-9, "tilt_angle": 20.0})
+    assert not store.claim(PARAMS, owner=dead_owner())  # Done points are never claimed again.
+    assert store.results() == [{**PARAMS, "mean_distance": 0.1}]
+    store.close()
+
+
+def test_stale_claims_are_reclaimed(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    assert store.claim(PARAMS, owner=dead_owner())
+    assert store.claim(PARAMS)
+
+    other = {"height_ratio": 0.6, "tilt_angle": 10.0}
+    assert store.claim(other, owner="other-host:1")
+    assert not store.claim(other)  # Other hosts are assumed alive without a lease.
+    store.lease = 0.0
+    assert store.claim(other)
+    store.close()
+
+
+def test_release(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    other = {"height_ratio": 0.6, "tilt_angle": 10.0}
+    assert store.claim(PARAMS)
+    assert store.claim(other, owner="other-host:1")
+
+    store.release(PARAMS)
+    assert store.claim(PARAMS, owner="other-host:2")
+
+    store.release_owner("other-host:1")
+    assert store.claim(other)
+    store.release_owner()
+    assert store.claim(other, owner="other-host:1")
+    assert not store.claim(PARAMS)  # Still claimed by other-host:2.
+    store.close()
@@ -5,7 +5,12 @@ import numpy as np
 from blenderproc.python.material import MaterialLoaderUtility
 from cipc.materials.penava import materials_by_name
 
-from cloth_manipulation.folds import BezierFoldTrajectory, EllipticalFoldTrajectory, SleeveFold
+from cloth_manipulation.folds import (
+    BezierFoldTrajectory,
+    BezierFoldTrajectoryBatch,
+    EllipticalFoldTrajectory,
+    SleeveFold,
+)
 from cloth_manipulation.scene import setup_enviroment_texture, setup_ground, setup_shirt_material
 
 bproc.init()
@@ -95,16 +100,20 @@ material.set_principled_shader_value("Base Color", (1.0, 1.0, 1.0, 1.0))
 material.set_principled_shader_value("Alpha", 0.4)
 material.blender_obj.diffuse_color = (1.0, 1.0, 1.0, 1.0)
 
+height_ratios = []
+angles = []
 for height_ratio in np.linspace(0.1, 1.0, 14):
     for angle in np.linspace(30.0, 90.0, max(2, int(18 * height_ratio))):
         tilt_angle = 90.0 - angle
         # values.append(f"{height_ratio}-{tilt_angle}")
-        angle = tilt_angle if fold.side == "right" else -1 * tilt_angle
-        fold_trajectory = BezierFoldTrajectory(fold, height_ratio, angle, end_height=0.05)
-        pose = fold_trajectory.pose(0.5)
-        sphere = bproc.object.create_primitive("SPHERE", location=pose.position, radius=0.015)  # * 0.3)
-        sphere.add_material(material)
-        # sphere.blender_obj.name = category
+        height_ratios.append(height_ratio)
+        angles.append(tilt_angle if fold.side == "right" else -1 * tilt_angle)
+
+fold_trajectories = BezierFoldTrajectoryBatch(fold, height_ratios, angles, end_heights=0.05)
+for position in fold_trajectories.positions([0.5])[:, 0]:
+    sphere = bproc.object.create_primitive("SPHERE", location=position, radius=0.015)  # * 0.3)
+    sphere.add_material(material)
+    # sphere.blender_obj.name = category
 
 
 end_height = 0.05
@@ -122,7 +131,7 @@ for height_ratio, angle in combos:
     material.set_principled_shader_value("Alpha", 0.3)
 
 ciruclar_trajectory = EllipticalFoldTrajectory(fold, end_angle=170)
-end_pose = ciruclar_trajectory.path.end
+end_pose = ciruclar_trajectory.end
 end_pose.position[2] = 0.05
 linear_path = abt.path.LinearPath(fold.gripper_start_pose().position, end_pose.position, np.identity(3))
 path, material = abt.visualize_path(linear_path, color=abt.colors.orange, radius=0.005)
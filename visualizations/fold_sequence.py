@@ -9,7 +9,7 @@ from cipc.simulator import SimulationCIPC
 from mathutils import Vector
 
 from cloth_manipulation.folds import BezierFoldTrajectory, MiddleFold, SideFold, SleeveFold
-from cloth_manipulation.scene import setup_ground
+from cloth_manipulation.scene import setup_enviroment_texture, setup_ground
 
 # 1. Setting up the scene
 bproc.init()
@@ -51,9 +51,7 @@ scene.render.resolution_y = 500
 scene.frame_start = 0
 
 filepaths = ensure_output_filepaths()
-hdri_name = "immenstadter_horn"
-hdri_path = abt.download_hdri(hdri_name, filepaths["run"], res="1k")
-abt.load_hdri(hdri_path)
+setup_enviroment_texture("immenstadter_horn")
 
 # 2. Creating the target shape and fold trajectories
 keypoints = {name: coord[0] for name, coord in shirt0.keypoints_3D.items()}